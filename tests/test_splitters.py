@@ -0,0 +1,87 @@
+"""Checks the latin tokenizers against the `re.split`-based tokenizer that they replaced,
+on seeded random strings.
+"""
+
+import re
+from typing import Iterator, List
+
+from numpy.random import Generator, default_rng
+import pytest
+
+from textprobability.core.splitters import (
+    iter_latin_token_spans,
+    iter_latin_tokens,
+    latin_token_spans,
+    latin_tokens,
+)
+
+# Characters of the kinds that tokenization treats differently: word characters of
+# several scripts, digits, punctuation, whitespace (including the less common kinds),
+# replacement characters, and unpaired surrogates (which strings decoded with
+# "surrogateescape" or "surrogatepass" may hold).
+ALPHABET = list(
+    "abcdeéßøçğş012_日本Ωж.,;:'\"-()!? \t\n\r\x0b\x0c\x1c\x85\xa0　"
+    "\ufffd\ud800\udbff\udc00\udfff"
+)
+EDGE_CASES = [
+    "",
+    " ",
+    "\ufffd",
+    "\ufffd\ufffd",
+    "a\ufffdb",
+    "\ufffd.\ufffd",
+    "\ud800",
+    "a\ud800b",
+    "\udfff\ud800",
+    " \udc80 \ufffd ",
+    "x\ud800\ufffd.y",
+]
+
+
+def reference(s: str) -> List[str]:
+    """Tokenizes `s` in the way that `latin_tokens` did originally."""
+    return [w for w in re.split(r"(?<=[^\w�])|(?=[^\w�])", s) if w.strip()]
+
+
+def strings(seed: int, n: int = 2000, max_len: int = 40) -> Iterator[str]:
+    rng = default_rng(seed)
+    yield from EDGE_CASES
+    for _ in range(n):
+        yield "".join(rng.choice(ALPHABET, rng.integers(0, max_len + 1)))
+
+
+def chunked(s: str, rng: Generator) -> List[str]:
+    """Returns `s` cut into a few chunks, some of which may be empty."""
+    cuts = sorted(rng.integers(0, len(s) + 1, rng.integers(0, 5)))
+    return [s[a:b] for a, b in zip([0, *cuts], [*cuts, len(s)])]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_latin_tokens(seed):
+    for s in strings(seed):
+        assert latin_tokens(s) == reference(s), repr(s)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_latin_token_spans(seed):
+    for s in strings(seed):
+        spans = latin_token_spans(s)
+        assert [s[start:end] for start, end in spans] == reference(s), repr(s)
+        assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:])), repr(s)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_iter_latin_token_spans(seed):
+    rng = default_rng(seed + 100)
+    for s in strings(seed):
+        chunks = chunked(s, rng)
+        expected = [(s[start:end], start, end) for start, end in latin_token_spans(s)]
+        assert [token for token, _, _ in expected] == reference(s), repr(s)
+        assert list(iter_latin_token_spans(chunks)) == expected, repr(chunks)
+        assert list(iter_latin_tokens(chunks)) == reference(s), repr(chunks)
+
+
+def test_iter_latin_token_spans_one_character_at_a_time():
+    for s in strings(0, n=200):
+        expected = [(s[start:end], start, end) for start, end in latin_token_spans(s)]
+        assert list(iter_latin_token_spans(s)) == expected, repr(s)
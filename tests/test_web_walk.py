@@ -0,0 +1,110 @@
+"""Walks a small graph of pages served from localhost."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from numpy.random import default_rng
+import pytest
+
+from textprobability.data.web_walk import (
+    concurrent_web_walk,
+    get_prefixer,
+    web_walk,
+)
+
+# The hyperlinks of each page
+GRAPH: Dict[str, List[str]] = {
+    "/a": ["/b", "/c"],
+    "/b": ["/a", "/d"],
+    "/c": [],
+    "/d": [],
+    "/s": ["/slow", "/a"],
+    "/slow": ["/e"],
+    "/e": [],
+}
+# The number of seconds that the server takes to serve /slow
+SLOW = 2.0
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        # The path and the time of arrival of each request
+        self.requests: List[Tuple[str, float]] = []
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, time.monotonic()))
+        if self.path == "/slow":
+            time.sleep(SLOW)
+        body = "<html><body><p>page {}</p>{}</body></html>".format(
+            self.path,
+            "".join('<a href="{}"></a>'.format(href) for href in GRAPH[self.path]),
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[Server]:
+    server = Server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def walk(walker, server: Server, start: str, **kwargs) -> List[str]:
+    return list(
+        walker(
+            server.url + start,
+            default_rng(0),
+            {server.url},
+            url_resolver=get_prefixer(server.url),
+            **kwargs
+        )
+    )
+
+
+@pytest.mark.parametrize("walker", [web_walk, concurrent_web_walk])
+def test_visits_every_reachable_page_once(walker, server):
+    texts = walk(walker, server, "/a")
+    assert sorted(texts) == ["page /a", "page /b", "page /c", "page /d"]
+    assert sorted(path for path, _ in server.requests) == ["/a", "/b", "/c", "/d"]
+
+
+@pytest.mark.parametrize("walker", [web_walk, concurrent_web_walk])
+def test_skips_pages_that_time_out(walker, server):
+    t = time.monotonic()
+    texts = walk(walker, server, "/s", timeout=0.2)
+    assert time.monotonic() - t < SLOW
+    assert sorted(texts) == ["page /a", "page /b", "page /c", "page /d", "page /s"]
+    paths = {path for path, _ in server.requests}
+    assert "/slow" in paths and "/e" not in paths
+
+
+def test_spaces_out_concurrent_requests(server):
+    min_interval = 0.3
+    walk(concurrent_web_walk, server, "/a", max_in_flight=4, min_interval=min_interval)
+    times = sorted(t for _, t in server.requests)
+    assert len(times) == 4
+    # Requests may be delayed on their way to the server, but they are not sent any
+    # sooner than `min_interval` apart.
+    assert all(b - a > min_interval / 2 for a, b in zip(times, times[1:]))
+    assert times[-1] - times[0] >= 3 * min_interval * 0.9
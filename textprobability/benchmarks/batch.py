@@ -0,0 +1,49 @@
+"""Compares the throughput of the batched Ps (see core/batch.py) with that of calling
+the default Ps once per string.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+from numpy.random import default_rng
+
+from textprobability.benchmarks.common import snippets, timed
+from textprobability.core import batch, defaults
+
+
+def main(langcode: str, path: str, n: int, seed: int) -> int:
+    data = defaults._get_data_latin(langcode, path)
+    strings = snippets(data, n, default_rng(seed))
+    for name, p, score_many in (
+        ("stateless", defaults.stateless, batch.stateless),
+        ("markov", defaults.markov, batch.markov),
+    ):
+        single, batched = p(langcode, path), score_many(langcode, path)
+        t_single, scores = timed(lambda: [single(s) for s in strings])
+        t_batched, actual = timed(lambda: batched(strings))
+        expected = np.array([np.nan if x is None else x for x in scores])
+        assert np.allclose(actual, expected, rtol=1e-12, atol=0, equal_nan=True)
+        print(
+            "{:<9}  per string: {:>9.0f} strings/s  batched: {:>9.0f} strings/s  "
+            "({:.1f}x)".format(name, n / t_single, n / t_batched, t_single / t_batched)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script benchmarks the batched Ps against the default Ps."
+    )
+    parser.add_argument("langcode", help="The language code of the language data.")
+    parser.add_argument(
+        "--path",
+        default=defaults.DEFAULT_DATA_PATH,
+        help="The directory that holds the language data.",
+    )
+    parser.add_argument(
+        "-n", default=20000, help="The number of strings to score.", type=int
+    )
+    parser.add_argument("--seed", default=2319, help="The random seed.", type=int)
+    args = parser.parse_args()
+    sys.exit(main(args.langcode, args.path, args.n, args.seed))
@@ -0,0 +1,44 @@
+"""Utilities shared by the benchmarks."""
+
+import time
+from typing import Callable, List, Tuple, TypeVar
+
+from numpy.random import Generator
+
+from textprobability.data.langdata import DefaultLangData
+
+
+def snippets(
+    data: DefaultLangData, n: int, rng: Generator, max_tokens: int = 8
+) -> List[str]:
+    """Returns `n` random snippets of text in the language described by `data`. Each
+    snippet has between 1 and `max_tokens` tokens, drawn according to their frequency in
+    the token lexicon, and about one token in ten is misspelled so that the fallbacks to
+    the char models are exercised.
+    """
+    counts, n_obs = data.token_lexicon.to_serializable()
+    tokens = list(counts)
+    p = [counts[token] / n_obs for token in tokens]
+    total = sum(p)
+    p = [x / total for x in p]
+    ret = []
+    for _ in range(n):
+        words = [
+            str(token)
+            for token in rng.choice(tokens, rng.integers(1, max_tokens + 1), p=p)
+        ]
+        for i in range(len(words)):
+            if rng.random() < 0.1:
+                words[i] = words[i] + words[i][::-1]
+        ret.append(" ".join(words))
+    return ret
+
+
+T = TypeVar("T")
+
+
+def timed(f: Callable[[], T]) -> Tuple[float, T]:
+    """Returns the time in seconds taken to call `f`, and its result."""
+    t0 = time.perf_counter()
+    ret = f()
+    return time.perf_counter() - t0, ret
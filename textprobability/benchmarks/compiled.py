@@ -0,0 +1,56 @@
+"""Compares the per-call time of the default Ps with that of their compiled versions
+(see core/compiled.py).
+"""
+
+import argparse
+import sys
+
+from numpy.random import default_rng
+
+from textprobability.benchmarks.common import snippets, timed
+from textprobability.core import defaults
+from textprobability.core.compiled import compile_p
+
+
+def main(langcode: str, path: str, n: int, seed: int) -> int:
+    data = defaults._get_data_latin(langcode, path)
+    strings = snippets(data, n, default_rng(seed))
+    for factory in (
+        defaults.stateless,
+        defaults.markov,
+        defaults.log_stateless,
+        defaults.log_markov,
+    ):
+        p = factory(langcode, path)
+        compiled = compile_p(p)
+        t_tree, expected = timed(lambda: [p(s) for s in strings])
+        t_compiled, actual = timed(lambda: [compiled(s) for s in strings])
+        assert actual == expected
+        print(
+            "{:<13}  tree: {:>6.1f} us/call  compiled: {:>6.1f} us/call  "
+            "({:.1f}x)".format(
+                factory.__name__,
+                1e6 * t_tree / n,
+                1e6 * t_compiled / n,
+                t_tree / t_compiled,
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script benchmarks the compiled Ps against the default Ps."
+    )
+    parser.add_argument("langcode", help="The language code of the language data.")
+    parser.add_argument(
+        "--path",
+        default=defaults.DEFAULT_DATA_PATH,
+        help="The directory that holds the language data.",
+    )
+    parser.add_argument(
+        "-n", default=20000, help="The number of strings to score.", type=int
+    )
+    parser.add_argument("--seed", default=2319, help="The random seed.", type=int)
+    args = parser.parse_args()
+    sys.exit(main(args.langcode, args.path, args.n, args.seed))
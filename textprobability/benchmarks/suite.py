@@ -0,0 +1,284 @@
+"""Measures the load time, scoring throughput, and memory use of the default models, and
+the throughput of building language data. The results can be written to a JSON file
+and compared with those of an earlier run, so that performance regressions are caught
+before a release.
+
+The name of each metric ends with its unit: `_s` (seconds) and `_mb` (megabytes) are
+better when lower, and `_per_s` (a rate) is better when higher.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+from numpy.random import default_rng
+
+from textprobability.benchmarks.common import snippets, timed
+from textprobability.classify import classifier
+from textprobability.core import batch, defaults
+from textprobability.data.build import builders
+
+Metrics = Dict[str, float]
+
+_FACTORIES = {
+    "stateless": (defaults.stateless, batch.stateless),
+    "markov": (defaults.markov, batch.markov),
+}
+_LANGCODES = ["en", "es", "fr", "pt", "de"]
+
+
+def _best(f: Callable[[], object], repeat: int) -> float:
+    """Returns the least time in seconds taken by any of `repeat` calls to `f`."""
+    return min(timed(f)[0] for _ in range(repeat))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes, except on macOS, where it is in bytes.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def _cold_load(job: Tuple[str, str, str, str]) -> Tuple[float, float]:
+    """Loads a model in a process that has loaded nothing yet, with snapshots in the
+    directory `cache_directory`, or with no snapshots if it is the empty string (see
+    loader.py). Returns the time taken and the peak resident set size of the process
+    afterwards.
+    """
+    name, langcode, path, cache_directory = job
+    os.environ["TEXTPROBABILITY_CACHE_DIR"] = cache_directory
+    t, _ = timed(lambda: _FACTORIES[name][0](langcode, path))
+    return t, _peak_rss_mb()
+
+
+def load_metrics(langcode: str, path: str, repeat: int) -> Metrics:
+    """Measures the time taken to load each default model for `langcode` in a fresh
+    process, both from the language data (cold) and from a snapshot of them (snapshot),
+    and again in this one, from the language data already loaded (registry), as well
+    as the peak memory use of a fresh process that has loaded it from the language
+    data.
+    """
+    ret: Metrics = {}
+    context = multiprocessing.get_context("spawn")
+
+    def load_in_fresh_processes(
+        name: str, cache_directory: str, n: int
+    ) -> List[Tuple[float, float]]:
+        results = []
+        for _ in range(n):
+            with context.Pool(1) as pool:
+                job = (name, langcode, path, cache_directory)
+                results.append(pool.apply(_cold_load, (job,)))
+        return results
+
+    for name, (factory, _) in _FACTORIES.items():
+        cold = load_in_fresh_processes(name, "", repeat)
+        with tempfile.TemporaryDirectory() as cache_directory:
+            # The first load writes the snapshot that the others load.
+            snapshot = load_in_fresh_processes(name, cache_directory, repeat + 1)[1:]
+        factory(langcode, path)
+        prefix = "{}.{}.".format(langcode, name)
+        ret[prefix + "cold_load_s"] = min(t for t, _ in cold)
+        ret[prefix + "snapshot_load_s"] = min(t for t, _ in snapshot)
+        ret[prefix + "registry_load_s"] = _best(lambda: factory(langcode, path), repeat)
+        ret[prefix + "peak_rss_mb"] = min(rss for _, rss in cold)
+    return ret
+
+
+def scoring_metrics(
+    langcode: str, path: str, strings: List[str], repeat: int
+) -> Metrics:
+    """Measures the rate at which each default P for `langcode` scores `strings`, one
+    at a time and in a batch.
+    """
+    ret: Metrics = {}
+    for name, (factory, batch_factory) in _FACTORIES.items():
+        p, score_many = factory(langcode, path), batch_factory(langcode, path)
+        prefix = "{}.{}.".format(langcode, name)
+        ret[prefix + "snippets_per_s"] = len(strings) / _best(
+            lambda: [p(s) for s in strings], repeat
+        )
+        ret[prefix + "batch_snippets_per_s"] = len(strings) / _best(
+            lambda: score_many(strings), repeat
+        )
+    return ret
+
+
+def classifier_metrics(
+    langcodes: List[str], path: str, strings: List[str], repeat: int
+) -> Metrics:
+    """Measures the rate at which a classifier among `langcodes` classifies
+    `strings`.
+    """
+    classify = classifier({langcode: 1 for langcode in langcodes}, path)
+    classify.preload()
+    return {
+        "classifier.snippets_per_s": len(strings)
+        / _best(lambda: [classify(s) for s in strings], repeat)
+    }
+
+
+def builder_metrics(texts: List[str], repeat: int) -> Metrics:
+    """Measures the rate at which the default token and char builders count
+    `texts`.
+    """
+    size = sum(len(text) for text in texts) / 1e6
+    ret: Metrics = {}
+    for i, name in enumerate(("token", "char")):
+
+        def build() -> None:
+            builder = builders()[i]
+            for text in texts:
+                builder.add(text)
+
+        ret["builder.{}.mb_per_s".format(name)] = size / _best(build, repeat)
+    return ret
+
+
+def compare(
+    metrics: Metrics, baseline: Metrics, tolerance: float
+) -> List[Tuple[str, float, float, bool]]:
+    """Returns, for each metric in both `metrics` and `baseline`, its name, its
+    baseline value, its current value, and whether it is worse than the baseline by a
+    fraction greater than `tolerance`.
+    """
+    ret = []
+    for name in metrics:
+        if name not in baseline:
+            continue
+        old, new = baseline[name], metrics[name]
+        worse = old - new if name.endswith("_per_s") else new - old
+        ret.append((name, old, new, worse > tolerance * abs(old)))
+    return ret
+
+
+def main(
+    langcodes: List[str],
+    path: str,
+    n: int,
+    corpus_size: int,
+    repeat: int,
+    seed: int,
+    output: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+) -> int:
+    rng = default_rng(seed)
+    metrics: Metrics = {}
+    strings: List[str] = []
+    for langcode in langcodes:
+        data = defaults._get_data_latin(langcode, path)
+        strings_of_langcode = snippets(data, n, rng)
+        strings += strings_of_langcode
+        metrics.update(load_metrics(langcode, path, repeat))
+        metrics.update(scoring_metrics(langcode, path, strings_of_langcode, repeat))
+    metrics.update(
+        classifier_metrics(langcodes, path, strings[:: len(langcodes)], repeat)
+    )
+    texts: List[str] = []
+    while sum(len(text) for text in texts) < corpus_size:
+        texts.append(" ".join(strings[int(i)] for i in rng.integers(0, n, 100)))
+    metrics.update(builder_metrics(texts, repeat))
+    for name, value in metrics.items():
+        print("{:<40} {:>14.6g}".format(name, value))
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "n": n,
+                    "corpus_size": corpus_size,
+                    "seed": seed,
+                    "metrics": metrics,
+                },
+                f,
+                indent=2,
+            )
+    if baseline is None:
+        return 0
+    with open(baseline) as f:
+        comparison = compare(metrics, json.load(f)["metrics"], tolerance)
+    print("\nCompared with {}:".format(baseline))
+    for name, old, new, regressed in comparison:
+        change = "{:+.1%}".format(new / old - 1) if old else "n/a"
+        print(
+            "{:<40} {:>14.6g} -> {:<14.6g} ({}){}".format(
+                name, old, new, change, "  REGRESSION" if regressed else ""
+            )
+        )
+    return 1 if any(regressed for *_, regressed in comparison) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script measures the performance of the default models, and "
+        "optionally compares it with that of an earlier run. It exits with status 1 if "
+        "there is a regression."
+    )
+    parser.add_argument(
+        "langcodes",
+        nargs="*",
+        default=_LANGCODES,
+        help="The language codes of the language data. By default, all default "
+        "languages are used.",
+    )
+    parser.add_argument(
+        "--path",
+        default=defaults.DEFAULT_DATA_PATH,
+        help="The directory that holds the language data.",
+    )
+    parser.add_argument(
+        "-n",
+        default=2000,
+        help="The number of snippets to score per language.",
+        type=int,
+    )
+    parser.add_argument(
+        "--corpus-size",
+        default=2**20,
+        help="The number of characters in the corpus from which to build.",
+        type=int,
+    )
+    parser.add_argument(
+        "--repeat",
+        default=3,
+        help="The number of times to repeat each measurement. The best result is "
+        "reported.",
+        type=int,
+    )
+    parser.add_argument("--seed", default=2319, help="The random seed.", type=int)
+    parser.add_argument(
+        "--output", default=None, help="The path of a JSON file for the results."
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="The path of a JSON file written by an earlier run, to compare with.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        default=0.1,
+        help="The fraction by which a metric may be worse than its baseline before it "
+        "is reported as a regression.",
+        type=float,
+    )
+    args = parser.parse_args()
+    sys.exit(
+        main(
+            args.langcodes,
+            args.path,
+            args.n,
+            args.corpus_size,
+            args.repeat,
+            args.seed,
+            args.output,
+            args.baseline,
+            args.tolerance,
+        )
+    )
@@ -0,0 +1,96 @@
+"""Compares the time taken by `latin_tokens` with that of the `re.split`-based
+tokenizer that it replaced, on short snippets and on a large document, after checking
+on random strings that the two produce the same tokens.
+"""
+
+import argparse
+import re
+import sys
+from typing import List
+
+from numpy.random import Generator, default_rng
+
+from textprobability.benchmarks.common import timed
+from textprobability.core.splitters import (
+    iter_latin_token_spans,
+    iter_latin_tokens,
+    latin_token_spans,
+    latin_tokens,
+)
+
+# Characters of the kinds that tokenization treats differently: word characters of
+# several scripts, digits, punctuation, whitespace (including the less common kinds),
+# and the replacement character.
+_ALPHABET = list("abcdeéßøçğş012_日本Ωж.,;:'\"-()!? \t\n\r\x0b\x0c\x1c\x85\xa0　�")
+_WORDS = "the of and to in a is that for it as was with be by on not he this".split()
+
+
+def _reference(s: str) -> List[str]:
+    """Tokenizes `s` in the way that `latin_tokens` did originally."""
+    return [w for w in re.split(r"(?<=[^\w�])|(?=[^\w�])", s) if w.strip()]
+
+
+def _random_string(rng: Generator, max_len: int) -> str:
+    return "".join(rng.choice(_ALPHABET, rng.integers(0, max_len + 1)))
+
+
+def _prose(rng: Generator, n_words: int) -> str:
+    words = rng.choice(_WORDS, n_words)
+    punctuation = rng.choice([" ", " ", " ", ", ", ". ", "\n"], n_words)
+    return "".join(w + p for w, p in zip(words, punctuation))
+
+
+def check(rng: Generator, n: int) -> None:
+    """Raises an AssertionError unless `latin_tokens` and the tokenizers derived from it
+    agree with the original tokenizer on `n` random strings.
+    """
+    for _ in range(n):
+        s = _random_string(rng, 40)
+        expected = _reference(s)
+        assert latin_tokens(s) == expected, s
+        assert [s[start:end] for start, end in latin_token_spans(s)] == expected, s
+        cuts = sorted(rng.integers(0, len(s) + 1, rng.integers(0, 4)))
+        chunks = [s[a:b] for a, b in zip([0, *cuts], [*cuts, len(s)])]
+        assert list(iter_latin_tokens(chunks)) == expected, chunks
+        spans = [(s[start:end], start, end) for start, end in latin_token_spans(s)]
+        assert list(iter_latin_token_spans(chunks)) == spans, chunks
+
+
+def main(n: int, document_size: int, seed: int) -> int:
+    rng = default_rng(seed)
+    check(rng, n)
+    print("latin_tokens agrees with the original tokenizer on {} strings.".format(n))
+    snippets = [_prose(rng, int(rng.integers(1, 9))) for _ in range(n)]
+    document = _prose(rng, document_size // 3)[:document_size]
+    for name, tokenize in (("original", _reference), ("latin_tokens", latin_tokens)):
+        t_snippets, _ = timed(lambda: [tokenize(s) for s in snippets])
+        t_document, tokens = timed(lambda: tokenize(document))
+        print(
+            "{:<13}  snippets: {:>5.2f} us/call  document: {:>6.1f} MB/s  "
+            "({} tokens)".format(
+                name,
+                1e6 * t_snippets / n,
+                len(document) / 1e6 / t_document,
+                len(tokens),
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script benchmarks latin_tokens against the tokenizer that it "
+        "replaced."
+    )
+    parser.add_argument(
+        "-n", default=100000, help="The number of snippets to tokenize.", type=int
+    )
+    parser.add_argument(
+        "--document-size",
+        default=2**20,
+        help="The number of characters in the large document.",
+        type=int,
+    )
+    parser.add_argument("--seed", default=2319, help="The random seed.", type=int)
+    args = parser.parse_args()
+    sys.exit(main(args.n, args.document_size, args.seed))
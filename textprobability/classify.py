@@ -1,10 +1,13 @@
 """A language classifier with priors."""
 
-from typing import Callable, Dict
-
-from textprobability.core.defaults import markov, DEFAULT_DATA_PATH
-from textprobability.core.types import P
+from math import exp, log
+import threading
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional
 
+from textprobability.core.compiled import compile_scp
+from textprobability.core.defaults import markov, log_markov, DEFAULT_DATA_PATH
+from textprobability.core.splitters import latin_tokens
+from textprobability.core.types import P, LogP
 
 Classifier = Callable[[str], Dict[str, float]]
 
@@ -16,6 +19,19 @@ def _normalize(dist: Dict[str, float]) -> Dict[str, float]:
     return {key: dist[key] / total for key in dist}
 
 
+def _log_normalize(log_dist: Dict[str, float]) -> Dict[str, float]:
+    """Exponentiates and normalizes a map from keys to log-weights using the
+    log-sum-exp trick, so that weights too small to represent as floats still yield a
+    useful distribution.
+    """
+    greatest = max(log_dist.values())
+    if greatest == float("-inf"):  # Not normalizable :(
+        return {key: 1 / len(log_dist) for key in log_dist}
+    dist = {key: exp(log_dist[key] - greatest) for key in log_dist}
+    total = sum(dist.values())
+    return {key: dist[key] / total for key in dist}
+
+
 def _forceNumber(p: P) -> Callable[[str], float]:
     def ret(s):
         ret = p(s)
@@ -24,16 +40,200 @@ def _forceNumber(p: P) -> Callable[[str], float]:
     return ret
 
 
-def classifier(priors: Dict[str, float], path=DEFAULT_DATA_PATH) -> Classifier:
+def _forceLogNumber(p: LogP) -> Callable[[str], float]:
+    def ret(s):
+        ret = p(s)
+        return ret if ret is not None else float("-inf")
+
+    return ret
+
+
+class LazyClassifier:
+    """A Classifier that loads the model for each language on first use."""
+
+    def __init__(self, priors: Dict[str, float], path=DEFAULT_DATA_PATH):
+        """See `classifier`."""
+        self.priors = priors
+        self.path = path
+        # The models of a subclass need not be Ps; see EarlyExitClassifier.
+        self._markovs: Dict[str, Any] = {}
+        self._locks = {key: threading.Lock() for key in priors}
+
+    def _markov(self, langcode: str) -> Any:
+        ret = self._markovs.get(langcode)
+        if ret is None:
+            with self._locks[langcode]:
+                if langcode not in self._markovs:
+                    self._markovs[langcode] = self._load(langcode)
+                ret = self._markovs[langcode]
+        return ret
+
+    def _load(self, langcode: str) -> Callable[[str], float]:
+        return _forceNumber(markov(langcode, path=self.path))
+
+    def preload(
+        self, langcodes: Optional[Iterable[str]] = None, background: bool = False
+    ) -> Optional[threading.Thread]:
+        """Loads the models for the given languages so that they need not be loaded on
+        first use.
+        :param langcodes: The BCP-47 codes of the languages to load. By default, all
+            languages in the priors are loaded.
+        :param background: Whether to load the models in a background thread
+        :return: The background thread, if applicable
+        """
+        langcodes = list(self.priors if langcodes is None else langcodes)
+        for langcode in langcodes:
+            if langcode not in self.priors:
+                raise ValueError("{} is not among the priors.".format(langcode))
+        if background:
+            thread = threading.Thread(target=self.preload, args=(langcodes,))
+            thread.daemon = True
+            thread.start()
+            return thread
+        for langcode in langcodes:
+            self._markov(langcode)
+        return None
+
+    def __call__(self, s: str) -> Dict[str, float]:
+        return _normalize(
+            {key: self.priors[key] * self._markov(key)(s) for key in self.priors}
+        )
+
+
+def classifier(priors: Dict[str, float], path=DEFAULT_DATA_PATH) -> LazyClassifier:
     """Return a Classifier with priors proportional to the given priors (which
-    need not be normalized).
+    need not be normalized). The model for each language is loaded on first use; see
+    `LazyClassifier.preload` to load models ahead of time.
     :param priors: A map from BCP-47 language codes to numbers that are
     proportional to their prior probabilities.
     """
-    markovs = {key: _forceNumber(markov(key, path=path)) for key in priors}
-    return lambda str: _normalize(
-        {key: priors[key] * markovs[key](str) for key in priors}
-    )
+    return LazyClassifier(priors, path)
+
+
+class LazyLogClassifier(LazyClassifier):
+    """A LazyClassifier that computes in log space, so that it remains useful on long
+    strings whose probabilities would underflow.
+    """
+
+    def _load(self, langcode: str) -> Callable[[str], float]:
+        return _forceLogNumber(log_markov(langcode, path=self.path))
+
+    def __call__(self, s: str) -> Dict[str, float]:
+        return _log_normalize(
+            {
+                key: (log(self.priors[key]) if self.priors[key] > 0 else float("-inf"))
+                + self._markov(key)(s)
+                for key in self.priors
+            }
+        )
+
+
+def log_classifier(
+    priors: Dict[str, float], path=DEFAULT_DATA_PATH
+) -> LazyLogClassifier:
+    """Like `classifier`, but returns a Classifier that computes in log space. Its
+    output is the same up to rounding error, except on strings long enough that
+    `classifier` cannot tell the languages apart.
+    """
+    return LazyLogClassifier(priors, path)
+
+
+class EarlyExit(NamedTuple):
+    """The result of an early-exit classification."""
+
+    posteriors: Dict[str, float]
+    # The number of tokens that were scored before the classification was decided.
+    tokens: int
+
+
+class EarlyExitClassifier(LazyClassifier):
+    """A Classifier that scores a string one token at a time under all languages that
+    remain in contention, and stops as soon as one language is probable enough.
+    Languages whose posterior probabilities fall below a threshold are dropped, and are
+    assigned a posterior of 0.
+    """
+
+    def __init__(
+        self,
+        priors: Dict[str, float],
+        path=DEFAULT_DATA_PATH,
+        threshold: float = 1e-4,
+        confidence: float = 0.999,
+    ):
+        """See `early_exit_classifier`."""
+        if threshold * len(priors) >= 1:
+            raise ValueError("The threshold must be less than 1 / len(priors).")
+        super().__init__(priors, path)
+        self.threshold = threshold
+        self.confidence = confidence
+
+    def _load(self, langcode: str) -> Any:
+        return compile_scp(log_markov(langcode, path=self.path)).evaluate
+
+    def classify(self, s: str) -> EarlyExit:
+        """Returns the posterior probabilities of the languages given `s`, and the
+        number of tokens of `s` that were scored to obtain them.
+        """
+        log_weights = {
+            key: log(self.priors[key]) if self.priors[key] > 0 else float("-inf")
+            for key in self.priors
+        }
+        contenders = {key: self._markov(key) for key in self.priors}
+        posteriors = _log_normalize(log_weights)
+        tokens = latin_tokens(s)
+        consumed = 0
+        while consumed < len(tokens) and max(posteriors.values()) < self.confidence:
+            for key, evaluate in contenders.items():
+                score = evaluate(tokens, consumed)
+                log_weights[key] += float("-inf") if score is None else score
+            consumed += 1
+            posteriors = _log_normalize(log_weights)
+            dropped = [key for key in contenders if posteriors[key] < self.threshold]
+            if dropped:
+                for key in dropped:
+                    del contenders[key]
+                    del log_weights[key]
+                # The posteriors of the languages that remain are renormalized.
+                posteriors = _log_normalize(log_weights)
+        return EarlyExit(
+            {key: posteriors.get(key, 0.0) for key in self.priors}, consumed
+        )
+
+    def __call__(self, s: str) -> Dict[str, float]:
+        return self.classify(s).posteriors
+
+
+def early_exit_classifier(
+    priors: Dict[str, float],
+    path=DEFAULT_DATA_PATH,
+    threshold: float = 1e-4,
+    confidence: float = 0.999,
+) -> EarlyExitClassifier:
+    """Like `log_classifier`, but each string is scored only until its language is
+    clear, which saves time on long strings and on large sets of languages. Use
+    `EarlyExitClassifier.classify` to learn how many tokens were scored.
+    :param threshold: The posterior probability below which a language is dropped
+    :param confidence: The posterior probability above which a language is chosen
+    """
+    return EarlyExitClassifier(priors, path, threshold, confidence)
+
+
+def joint_classifier(priors: Dict[str, float], path=DEFAULT_DATA_PATH) -> Classifier:
+    """Like `classifier`, but each string is tokenized once and scored under all
+    languages together (see core/joint.py), so that the cost of classification hardly
+    grows with the number of languages. The models of all languages are loaded
+    immediately.
+    """
+    # NumPy is imported here so that importing this module stays cheap.
+    from textprobability.core.joint import joint_markov
+
+    model = joint_markov(list(priors), path)
+
+    def ret(s: str) -> Dict[str, float]:
+        scores = model(s)
+        return _normalize({key: priors[key] * (scores[key] or 0) for key in priors})
+
+    return ret
 
 
 default_classifier = classifier(
@@ -0,0 +1,85 @@
+"""A client of the classification server (see server.py). It imports neither NumPy nor
+any language data, so that it costs next to nothing to load.
+
+Requests and responses are JSON objects, one per line. A request has an "op"
+("classify", "markov", or "stateless") and a list of "strings". Scoring requests also
+have a "langcode", and classification requests may have "priors", which default to
+those of the server. A response has either "results", with one result per string, or
+an "error".
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "textprobability.sock")
+
+# The path of a Unix socket, or the host and port of a TCP socket
+Address = Union[str, Tuple[str, int]]
+
+
+class ServerError(Exception):
+    """An error reported by the server."""
+
+
+class Client:
+    """A connection to a classification server. A Client may be shared by several
+    threads, whose requests are sent one at a time.
+    """
+
+    def __init__(self, address: Address = DEFAULT_SOCKET):
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.connect(address)
+        self._file = self._socket.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def _request(self, request: Dict[str, Any]) -> List[Any]:
+        with self._lock:
+            self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            raise ServerError(response["error"])
+        return response["results"]
+
+    def classify(
+        self, strings: Sequence[str], priors: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, float]]:
+        """Returns what `classify.classifier(priors)` returns for each of `strings`.
+        :param priors: The priors, or None to use those of the server
+        """
+        request: Dict[str, Any] = {"op": "classify", "strings": list(strings)}
+        if priors is not None:
+            request["priors"] = priors
+        return self._request(request)
+
+    def markov(self, langcode: str, strings: Sequence[str]) -> List[Optional[float]]:
+        """Returns what `defaults.markov(langcode)` returns for each of `strings`."""
+        return self._request(
+            {"op": "markov", "langcode": langcode, "strings": list(strings)}
+        )
+
+    def stateless(self, langcode: str, strings: Sequence[str]) -> List[Optional[float]]:
+        """Returns what `defaults.stateless(langcode)` returns for each of `strings`."""
+        return self._request(
+            {"op": "stateless", "langcode": langcode, "strings": list(strings)}
+        )
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,184 @@
+"""This module provides batched versions of the default Ps (see defaults.py). Each one
+is a BatchP that scores a whole sequence of strings at once: linguistic units are mapped
+to integer IDs, and lookups, fallbacks, and products are NumPy array operations over
+the whole batch.
+
+Undefined probabilities, which the default Ps represent as None, are represented as NaN.
+"""
+
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from textprobability.core.defaults import (
+    _get_data_latin,
+    CHARS2CHAR,
+    DEFAULT_DATA_PATH,
+    TOKENS2TOKEN,
+)
+from textprobability.core.splitters import latin_tokens
+from textprobability.core.types import ContextLexicon, Lexicon, Unit
+
+BatchP = Callable[[Sequence[str]], np.ndarray]
+
+
+class _Level:
+    """Holds the lexicon and context lexicon of one level of linguistic unit as arrays
+    that are indexed by unit ID.
+    """
+
+    def __init__(
+        self, lexicon: Lexicon, context_lexicon: Optional[ContextLexicon] = None
+    ):
+        counts, n_obs = lexicon.to_serializable()
+        contexts = (
+            []
+            if context_lexicon is None
+            else [
+                (ngram, *context_lexicon[ngram].to_serializable())
+                for ngram in context_lexicon
+            ]
+        )
+        self.ids = {unit: i for i, unit in enumerate(counts)}
+        for ngram, entries, _ in contexts:
+            for unit in (*ngram, *entries):
+                self.ids.setdefault(unit, len(self.ids))
+        # Units that are not in the vocabulary get the ID `self.unknown`.
+        self.unknown = len(self.ids)
+        self.p = np.full(self.unknown + 1, np.nan)
+        self.p[: len(counts)] = [count / n_obs for count in counts.values()]
+        self.k = len(contexts[0][0]) if contexts else 0
+        if any(len(ngram) != self.k for ngram, _, _ in contexts):
+            raise ValueError("The contexts of a level must all have the same length.")
+        # (Context, unit) pairs are encoded as integers in base `self._radix`.
+        self._radix = self.unknown + 1
+        if self._radix ** (self.k + 1) >= 2**63:
+            raise ValueError("The contexts of this level are too long to be encoded.")
+        keys: List[int] = []
+        probabilities: List[float] = []
+        for ngram, entries, context_n_obs in contexts:
+            code = 0
+            for unit in ngram:
+                code = code * self._radix + self.ids[unit]
+            for unit, count in entries.items():
+                keys.append(code * self._radix + self.ids[unit])
+                probabilities.append(count / context_n_obs)
+        order = np.argsort(np.array(keys, dtype=np.int64), kind="stable")
+        self._keys = np.array(keys, dtype=np.int64)[order]
+        self._conditional_p = np.array(probabilities, dtype=np.float64)[order]
+
+    def encode(self, units: Sequence[Unit]) -> np.ndarray:
+        """Returns the IDs of `units`."""
+        return np.fromiter(
+            (self.ids.get(unit, self.unknown) for unit in units),
+            dtype=np.int64,
+            count=len(units),
+        )
+
+    def conditional(self, ids: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Returns the probability of each unit given the `self.k` units that precede
+        it, or NaN where that is undefined.
+        :param ids: The IDs of a concatenation of sequences of units
+        :param positions: The position of each unit in its own sequence
+        """
+        if not self._keys.size or not ids.size:
+            return np.full(ids.shape, np.nan)
+        codes = np.zeros(ids.shape, dtype=np.int64)
+        for distance in range(self.k, 0, -1):
+            codes = codes * self._radix + np.roll(ids, distance)
+        codes = codes * self._radix + ids
+        i = np.minimum(np.searchsorted(self._keys, codes), self._keys.size - 1)
+        hit = (self._keys[i] == codes) & (positions >= self.k)
+        return np.where(hit, self._conditional_p[i], np.nan)
+
+
+def _split(sequences: Sequence[Sequence[Unit]]) -> Tuple[List[Unit], np.ndarray]:
+    """Returns the concatenation of `sequences` and their lengths."""
+    units: List[Unit] = []
+    for sequence in sequences:
+        units.extend(sequence)
+    return units, np.fromiter(
+        (len(sequence) for sequence in sequences), dtype=np.int64, count=len(sequences)
+    )
+
+
+def _positions(lengths: np.ndarray) -> np.ndarray:
+    """Returns the position of each unit in its own sequence, given the lengths of
+    consecutive sequences.
+    """
+    starts = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(starts, lengths)
+
+
+def _products(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Returns the product of each run of `values` (along its first axis), given the
+    lengths of consecutive runs. The product of an empty run is 1.
+    """
+    ret = np.ones((lengths.size, *values.shape[1:]))
+    nonempty = lengths > 0
+    if values.size:
+        starts = (np.cumsum(lengths) - lengths)[nonempty]
+        ret[nonempty] = np.multiply.reduceat(values, starts)
+    return ret
+
+
+def stateless(langcode: str, path=DEFAULT_DATA_PATH) -> BatchP:
+    """Returns a batched version of `defaults.stateless`."""
+    data = _get_data_latin(langcode, path)
+    tokens, chars = _Level(data.token_lexicon), _Level(data.char_lexicon)
+    token2char = 1 / data.token_lexicon.n_obs
+
+    def score_many(strings: Sequence[str]) -> np.ndarray:
+        units, lengths = _split([latin_tokens(s) for s in strings])
+        p = tokens.p[tokens.encode(units)]
+        oov = np.isnan(p)
+        p[~oov] *= 1 - token2char
+        oov_units, oov_lengths = _split([units[i] for i in np.flatnonzero(oov)])
+        p[oov] = _products(chars.p[chars.encode(oov_units)], oov_lengths) * token2char
+        return _products(p, lengths)
+
+    return score_many
+
+
+def markov(langcode: str, path=DEFAULT_DATA_PATH) -> BatchP:
+    """Returns a batched version of `defaults.markov`."""
+    data = _get_data_latin(langcode, path)
+    tokens = _Level(data.token_lexicon, data.token_context_lexicon)
+    chars = _Level(data.char_lexicon, data.char_context_lexicon)
+    token2char = 1 / data.token_lexicon.n_obs
+    char2nothing = 1 / data.char_lexicon.n_obs
+
+    def score_many(strings: Sequence[str]) -> np.ndarray:
+        units, lengths = _split([latin_tokens(s) for s in strings])
+        ids = tokens.encode(units)
+        conditional = tokens.conditional(ids, _positions(lengths))
+        p = np.where(
+            np.isnan(conditional),
+            tokens.p[ids] * TOKENS2TOKEN,
+            conditional * (1 - TOKENS2TOKEN),
+        )
+        oov = np.isnan(p)
+        p[~oov] *= 1 - token2char
+        # Tokens contain no whitespace, so each character of an OOV token is its own
+        # sole latin token.
+        oov_units, oov_lengths = _split([units[i] for i in np.flatnonzero(oov)])
+        char_ids = chars.encode(oov_units)
+        char_conditional = chars.conditional(char_ids, _positions(oov_lengths))
+        unigram = chars.p[char_ids]
+        unigram = np.where(
+            np.isnan(unigram), char2nothing, unigram * (1 - char2nothing)
+        )
+        p[oov] = (
+            _products(
+                np.where(
+                    np.isnan(char_conditional),
+                    unigram * CHARS2CHAR,
+                    char_conditional * (1 - CHARS2CHAR),
+                ),
+                oov_lengths,
+            )
+            * token2char
+        )
+        return _products(p, lengths)
+
+    return score_many
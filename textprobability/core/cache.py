@@ -0,0 +1,76 @@
+"""This module implements a bounded cache for the probabilities of linguistic units.
+
+Real text is repetitive, so the probabilities that a P assigns to the same unit in the
+same way are worth remembering. A CompoundPFactory accepts an optional cache, in which
+case its fallback probabilities (which depend only on the unit, and not on its context)
+are memoized.
+"""
+
+from collections import OrderedDict
+from itertools import count
+import threading
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from textprobability.core.types import Unit
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache:
+    """A cache that holds at most `maxsize` entries, evicting the least recently used
+    entry first. One LRUCache may be shared by any number of memoized functions.
+    """
+
+    def __init__(self, maxsize: int = 2**16):
+        """:param maxsize: the maximum number of entries held by `self`"""
+        if maxsize <= 0:
+            raise ValueError("The size of a cache must be positive.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[int, Unit], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._namespaces = count()
+
+    def memoize(
+        self, f: Callable[[Unit], Optional[float]]
+    ) -> Callable[[Unit], Optional[float]]:
+        """Returns a function that computes the same thing as `f`, but that looks up
+        its results in `self` first.
+        """
+        namespace = next(self._namespaces)
+        entries = self._entries
+        lock = self._lock
+
+        def memoized(unit: Unit) -> Optional[float]:
+            key = (namespace, unit)
+            with lock:
+                if key in entries:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return entries[key]
+            value = f(unit)
+            with lock:
+                self.misses += 1
+                entries[key] = value
+                if len(entries) > self.maxsize:
+                    entries.popitem(last=False)
+            return value
+
+        return memoized
+
+    def info(self) -> CacheInfo:
+        """Returns statistics about the use of `self`."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        """Empties `self` and resets its statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
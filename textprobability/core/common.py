@@ -3,27 +3,117 @@ obvious implementation. See types.py for documentation.
 """
 
 from functools import reduce
-from typing import cast, Optional, Callable
+from math import exp, log1p
+from typing import cast, Any, Optional, Callable, TypeVar
+
+from textprobability.core.types import (
+    Collapser,
+    CompoundPFactory,
+    StatelessPFactory,
+    LogCollapser,
+    LogCompoundPFactory,
+    LogStatelessPFactory,
+)
+
+F = TypeVar("F", bound=Callable)
+
+
+def annotated(f: F, kind: str, *args: Any) -> F:
+    """Records on `f` the kind of combinator that built it and the arguments that it
+    was built from, so that the structure of a P can be inspected (see compiled.py).
+    """
+    f.structure = (kind, args)  # type: ignore
+    return f
+
+
+def _memoized(p: Callable[[str], Optional[float]], cache: Any):
+    return p if cache is None else cache.memoize(p)
 
-from textprobability.core.types import Collapser, CompoundPFactory, StatelessPFactory
 
 _safe_mul: Callable[[Optional[float], Optional[float]], Optional[float]] = (
-    lambda a, b: a * b if a is not None and b is not None else None
+    lambda a, b: (a * b if a is not None and b is not None else None)
+)
+
+collapser: Collapser = lambda scp, splitter: annotated(
+    lambda string: reduce(_safe_mul, scp(splitter(string)), cast(Optional[float], 1)),
+    "collapser",
+    scp,
+    splitter,
+)
+
+# If a cache (see cache.py) is given, the probabilities assigned by SCP2 to each Unit
+# are memoized.
+cpf: CompoundPFactory = lambda scp1, scp2, scp3, splitter, cache=None: annotated(
+    (
+        lambda p2: lambda sequence: [
+            (
+                None
+                if prob3 is None
+                else (
+                    _safe_mul(p2(unit), prob3) if prob1 is None else prob1 * (1 - prob3)
+                )
+            )
+            for prob1, prob3, unit in zip(scp1(sequence), scp3(sequence), sequence)
+        ]
+    )(_memoized(collapser(scp2, splitter), cache)),
+    "cpf",
+    scp1,
+    scp2,
+    scp3,
+    splitter,
+    cache,
 )
 
-collapser: Collapser = lambda scp, splitter: lambda string: reduce(
-    _safe_mul, scp(splitter(string)), cast(Optional[float], 1)
+spf: StatelessPFactory = lambda lexicon: annotated(
+    lambda sequence: [lexicon.get(unit, None) for unit in sequence], "spf", lexicon
 )
 
-cpf: CompoundPFactory = lambda scp1, scp2, scp3, splitter: (
-    lambda p2: lambda sequence: [
-        None
-        if prob3 is None
-        else (_safe_mul(p2(unit), prob3) if prob1 is None else prob1 * (1 - prob3))
-        for prob1, prob3, unit in zip(scp1(sequence), scp3(sequence), sequence)
-    ]
-)(collapser(scp2, splitter))
+# -------------------------------------------------------------------------------------#
+# The following are the log-space counterparts of the above. Products become sums.     |
+# -------------------------------------------------------------------------------------#
 
-spf: StatelessPFactory = lambda lexicon: lambda sequence: [
-    lexicon.get(unit, None) for unit in sequence
-]
+_safe_add: Callable[[Optional[float], Optional[float]], Optional[float]] = (
+    lambda a, b: (a + b if a is not None and b is not None else None)
+)
+
+
+def log1mexp(x: float) -> float:
+    """Returns log(1 - exp(x)) for a log-probability `x`."""
+    return log1p(-exp(x)) if x < 0 else float("-inf")
+
+
+log_collapser: LogCollapser = lambda scp, splitter: annotated(
+    lambda string: reduce(_safe_add, scp(splitter(string)), cast(Optional[float], 0.0)),
+    "log_collapser",
+    scp,
+    splitter,
+)
+
+log_cpf: LogCompoundPFactory = lambda scp1, scp2, scp3, splitter, cache=None: annotated(
+    (
+        lambda p2: lambda sequence: [
+            (
+                None
+                if prob3 is None
+                else (
+                    _safe_add(p2(unit), prob3)
+                    if prob1 is None
+                    else prob1 + log1mexp(prob3)
+                )
+            )
+            for prob1, prob3, unit in zip(scp1(sequence), scp3(sequence), sequence)
+        ]
+    )(_memoized(log_collapser(scp2, splitter), cache)),
+    "log_cpf",
+    scp1,
+    scp2,
+    scp3,
+    splitter,
+    cache,
+)
+
+log_spf: LogStatelessPFactory = lambda lexicon: annotated(
+    lambda sequence: [lexicon.log_get(unit, None) for unit in sequence],
+    "log_spf",
+    lexicon,
+)
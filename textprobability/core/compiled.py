@@ -0,0 +1,251 @@
+"""This module compiles a P that was assembled from the combinators in common.py and
+mpf.py into a flat evaluator.
+
+A P assembled from combinators is a tree of closures, each of which builds a list of
+probabilities for a whole sequence before its parent combines them. The compiled
+evaluator instead computes the probability of one unit at a time, all the way down the
+tree, so that no intermediate lists are built and constant SCPs cost nothing. Splitting
+is done once per unit: a unit is not split again by the splitter that produced it
+(Splitters are idempotent), and other splits are shared across branches for the
+duration of one call. The result is exactly that of the original P.
+
+Combinators that are not recognized (see `annotated` in common.py) are evaluated as
+opaque SCPs, which must return one probability per unit.
+"""
+
+from operator import add, mul
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence
+
+from textprobability.core.common import log1mexp
+from textprobability.core.lexicon import BackoffContextLexicon, FlatContextLexicon
+from textprobability.core.types import Splitter, Unit
+from textprobability.data.mapped import MappedContextLexicon
+
+# Splits that have been computed during a single call, keyed by splitter and unit.
+Memo = Dict[Any, Any]
+# An Evaluator returns the probability of the unit at a given index of a sequence.
+Evaluator = Callable[[Sequence[Unit], int, Memo], Optional[float]]
+# Returns the probability of a unit by splitting it and collapsing the result.
+UnitP = Callable[[Unit, Memo], Optional[float]]
+
+
+class _Algebra(NamedTuple):
+    """The arithmetic of linear or log probabilities."""
+
+    one: float
+    times: Callable[[float, float], float]
+    complement: Callable[[float], float]
+    lookup: str  # The name of the Lexicon method that looks up a unit
+
+
+_LINEAR = _Algebra(1, mul, lambda p: 1 - p, "get")
+_LOG = _Algebra(0.0, add, log1mexp, "log_get")
+_KINDS = {
+    "collapser": ("collapser", _LINEAR),
+    "cpf": ("cpf", _LINEAR),
+    "spf": ("spf", _LINEAR),
+    "mpf": ("mpf", _LINEAR),
+    "log_collapser": ("collapser", _LOG),
+    "log_cpf": ("cpf", _LOG),
+    "log_spf": ("spf", _LOG),
+    "log_mpf": ("mpf", _LOG),
+}
+
+
+class _Compiler:
+    def __init__(self, algebra: _Algebra):
+        self.algebra = algebra
+
+    def kind(self, f: Any) -> Optional[str]:
+        """Returns the kind of combinator that built `f`, or None if `f` is opaque."""
+        structure = getattr(f, "structure", None)
+        if structure is None:
+            return None
+        if structure[0] == "constant":
+            return "constant"
+        kind, algebra = _KINDS.get(structure[0], (None, None))
+        return kind if algebra is self.algebra else None
+
+    def scp(self, scp: Any, source: Optional[Splitter]) -> Evaluator:
+        """Compiles `scp`, which is applied to sequences produced by `source`."""
+        kind = self.kind(scp)
+        if kind == "constant":
+            (c,) = scp.structure[1]
+            return lambda sequence, i, memo: c
+        if kind == "spf":
+            get = getattr(scp.structure[1][0], self.algebra.lookup)
+            return lambda sequence, i, memo: get(sequence[i], None)
+        if kind == "mpf":
+            return self.mpf(scp.structure[1][0])
+        if kind == "cpf":
+            scp1, scp2, scp3, splitter, cache = scp.structure[1]
+            return self.cpf(scp1, scp2, scp3, splitter, cache, source)
+        return self.opaque(scp)
+
+    def context(self, scp: Any) -> int:
+        """Returns the number of preceding units on which the probability that `scp`
+        assigns to a unit depends.
+        """
+        kind = self.kind(scp)
+        if kind in ("constant", "spf"):
+            return 0
+        if kind == "mpf":
+            cl = scp.structure[1][0]
+            if isinstance(cl, (FlatContextLexicon, MappedContextLexicon)):
+                return cl.n
+            if isinstance(cl, BackoffContextLexicon):
+                return cl.order
+            return len(next(iter(cl.keys())))
+        if kind == "cpf":
+            scp1, _, scp3, _, _ = scp.structure[1]
+            return max(self.context(scp1), self.context(scp3))
+        raise ValueError("The context of an opaque SCP is unknown.")
+
+    def mpf(self, cl: Any) -> Evaluator:
+        if isinstance(cl, (FlatContextLexicon, MappedContextLexicon)):
+            n = cl.n
+            get = getattr(cl, self.algebra.lookup + "_conditional")
+            return lambda sequence, i, memo: (
+                None if i < n else get(sequence[i - n : i], sequence[i])
+            )
+        if isinstance(cl, BackoffContextLexicon):
+            order = cl.order
+            get = getattr(cl, self.algebra.lookup + "_conditional")
+            return lambda sequence, i, memo: get(
+                sequence[max(i - order, 0) : i], sequence[i]
+            )
+        key_len = len(next(iter(cl.keys())))
+        lookup = self.algebra.lookup
+
+        def evaluator(sequence, i, memo):
+            if i < key_len:
+                return None
+            lexicon = cl.get(tuple(sequence[i - key_len : i]))
+            return None if lexicon is None else getattr(lexicon, lookup)(sequence[i])
+
+        return evaluator
+
+    def cpf(
+        self,
+        scp1: Any,
+        scp2: Any,
+        scp3: Any,
+        splitter: Splitter,
+        cache: Any = None,
+        source: Any = None,
+    ) -> Evaluator:
+        times = self.algebra.times
+        evaluator1 = self.scp(scp1, source)
+        p2 = self.unit_p(scp2, splitter, source)
+        if cache is not None:
+            uncached_p2 = p2
+            memoized = cache.memoize(lambda unit: uncached_p2(unit, {}))
+            p2 = lambda unit, memo: memoized(unit)
+        if self.kind(scp3) == "constant":
+            (prob3,) = scp3.structure[1]
+            complement = self.algebra.complement(prob3)
+
+            def evaluator(sequence, i, memo):
+                prob1 = evaluator1(sequence, i, memo)
+                if prob1 is None:
+                    prob2 = p2(sequence[i], memo)
+                    return None if prob2 is None else times(prob2, prob3)
+                return times(prob1, complement)
+
+            return evaluator
+        evaluator3 = self.scp(scp3, source)
+
+        def general_evaluator(sequence, i, memo):
+            prob3 = evaluator3(sequence, i, memo)
+            if prob3 is None:
+                return None
+            prob1 = evaluator1(sequence, i, memo)
+            if prob1 is None:
+                prob2 = p2(sequence[i], memo)
+                return None if prob2 is None else times(prob2, prob3)
+            return times(prob1, self.algebra.complement(prob3))
+
+        return general_evaluator
+
+    def opaque(self, scp: Any) -> Evaluator:
+        def evaluator(sequence, i, memo):
+            key = (id(scp), id(sequence))
+            cached = memo.get(key)
+            if cached is None or cached[0] is not sequence:
+                cached = memo[key] = (sequence, scp(sequence))
+            return cached[1][i]
+
+        return evaluator
+
+    def unit_p(self, scp: Any, splitter: Splitter, source: Any) -> UnitP:
+        """Compiles the collapse of `scp` over `splitter`, for units produced by
+        `source`.
+        """
+        times, one = self.algebra.times, self.algebra.one
+        evaluator = self.scp(scp, splitter)
+        if splitter is source:
+
+            def unsplit_p(unit, memo):
+                value = evaluator((unit,), 0, memo)
+                return None if value is None else times(one, value)
+
+            return unsplit_p
+
+        def p(unit, memo):
+            key = (splitter, unit)
+            sequence = memo.get(key)
+            if sequence is None:
+                sequence = memo[key] = splitter(unit)
+            ret = one
+            for i in range(len(sequence)):
+                value = evaluator(sequence, i, memo)
+                if value is None:
+                    return None
+                ret = times(ret, value)
+            return ret
+
+        return p
+
+
+class CompiledSCP(NamedTuple):
+    """The SCP that a P collapses, compiled to evaluate one unit at a time."""
+
+    # Returns the probability of the unit at a given index of a sequence.
+    evaluate: Callable[[Sequence[Unit], int], Optional[float]]
+    # Splits strings into the sequences to which the SCP is applied.
+    splitter: Splitter
+    # The number of preceding units on which the probability of a unit depends.
+    context: int
+
+
+def _collapsed(p: Callable[[str], Optional[float]]) -> Any:
+    """Returns the algebra of `p`, the SCP that it collapses, and its splitter."""
+    structure = getattr(p, "structure", None)
+    kind, algebra = _KINDS.get(structure[0] if structure else "", (None, None))
+    if structure is None or kind != "collapser" or algebra is None:
+        raise ValueError("Only Ps that are returned by a collapser can be compiled.")
+    return (algebra, *structure[1])
+
+
+def compile_p(p: Callable[[str], Optional[float]]) -> Callable[[str], Optional[float]]:
+    """Returns a flat evaluator that computes exactly what `p` computes. `p` may be a P
+    or a LogP that was returned by a collapser.
+    """
+    algebra, scp, splitter = _collapsed(p)
+    top = _Compiler(algebra).unit_p(scp, splitter, None)
+    return lambda string: top(string, {})
+
+
+def compile_scp(p: Callable[[str], Optional[float]]) -> CompiledSCP:
+    """Returns the SCP that `p` collapses, compiled to evaluate one unit at a time.
+    Multiplying (or, for a LogP, adding), in order, the probabilities of the units into
+    which its splitter splits a string gives exactly what `p` computes. Unlike
+    `compile_p`, this does not accept Ps that contain opaque SCPs.
+    """
+    algebra, scp, splitter = _collapsed(p)
+    compiler = _Compiler(algebra)
+    context = compiler.context(scp)
+    evaluator = compiler.scp(scp, splitter)
+    return CompiledSCP(
+        lambda sequence, i: evaluator(sequence, i, {}), splitter, context
+    )
@@ -1,74 +1,115 @@
-"""This module exports general-purpose utilities that should suffice for most use cases.
-"""
+"""This module exports general-purpose utilities that should suffice for most use cases."""
+
+from math import log
 from pathlib import Path
-import json
+from typing import Any, Callable, NamedTuple, Optional
 
-from textprobability.core.types import SequentialConditionalP, P
-from textprobability.core.common import cpf, spf, collapser
+from textprobability.core.types import (
+    ContextLexicon,
+    Lexicon,
+    LogP,
+    LogSequentialConditionalP,
+    P,
+    SequentialConditionalP,
+    Splitter,
+)
+from textprobability.core.cache import LRUCache
+from textprobability.core.common import (
+    annotated,
+    cpf,
+    spf,
+    collapser,
+    log_cpf,
+    log_spf,
+    log_collapser,
+)
 import textprobability.core.mpf as mpf
 from textprobability.core.splitters import latin_tokens, characters
+from textprobability.data import loader
 from textprobability.data.langdata import DefaultLangData
-
+import textprobability.data.mapped as mapped
 
 DEFAULT_DATA_PATH: Path = Path(__file__).parent.parent / "data"
+# The probabilities with which the markov P falls back from an n-gram model to a
+# unigram model.
+TOKENS2TOKEN: float = 0.5  # FIXME: This is probably very wrong!
+CHARS2CHAR: float = 0.5  # FIXME: This is probably very wrong!
 
 
 def _get_data_latin(langcode: str, path: str) -> DefaultLangData:
-    """Retrieves the language data associated with `langcode`."""
+    """Retrieves the language data associated with `langcode`, preferring the binary
+    format (see mapped.py) to JSON when both are available. Language data are loaded
+    once and shared by every P built from them (see loader.py).
+    """
+    binary = Path(path) / "{}{}".format(langcode, mapped.SUFFIX)
+    if binary.exists():
+        return loader.load(binary)
     # FIXME: This should be placed on sys.path so that there is no reliance on relative
     # paths. This is one of a number of changes that would be required to allow people
     # to install and interact with this.
-    with open(Path(path) / "{}.json".format(langcode)) as f:
-        return DefaultLangData.from_serializable(json.load(f))
+    return loader.load(Path(path) / "{}.json".format(langcode))
 
 
 def _constant_scp3(c: float) -> SequentialConditionalP:
     """Returns a simple SCP that can only ever return one probability."""
-    return lambda sequence: [c for _ in range(len(sequence))]
+    return annotated(lambda sequence: [c for _ in range(len(sequence))], "constant", c)
 
 
-def stateless(langcode: str, path=DEFAULT_DATA_PATH) -> P:
-    """Returns the default stateless P for the given language."""
-    data: DefaultLangData = _get_data_latin(langcode, path)
-    token2char_scp3: SequentialConditionalP = _constant_scp3(
-        1 / data.token_lexicon.n_obs
-    )
-    return collapser(
-        cpf(
-            spf(data.token_lexicon), spf(data.char_lexicon), token2char_scp3, characters
+def _constant_log_scp3(c: float) -> LogSequentialConditionalP:
+    """Returns a simple LogSCP that can only ever return the log of one probability."""
+    return _constant_scp3(log(c) if c > 0 else float("-inf"))
+
+
+class _Combinators(NamedTuple):
+    """The building blocks from which the default Ps are assembled."""
+
+    collapser: Callable[[Any, Splitter], Any]
+    cpf: Callable[..., Any]  # The cache of a cpf is optional.
+    spf: Callable[[Lexicon], Any]
+    mpf: Callable[[ContextLexicon], Any]
+    constant: Callable[[float], Any]
+
+
+_LINEAR = _Combinators(collapser, cpf, spf, mpf.default, _constant_scp3)
+_LOG = _Combinators(
+    log_collapser, log_cpf, log_spf, mpf.log_default, _constant_log_scp3
+)
+
+
+def _stateless(
+    data: DefaultLangData, c: _Combinators, cache: Optional[LRUCache]
+) -> Any:
+    token2char_scp3 = c.constant(1 / data.token_lexicon.n_obs)
+    return c.collapser(
+        c.cpf(
+            c.spf(data.token_lexicon),
+            c.spf(data.char_lexicon),
+            token2char_scp3,
+            characters,
+            cache,
         ),
         latin_tokens,
     )
 
 
-def markov(langcode: str, path=DEFAULT_DATA_PATH) -> P:
-    """Returns the default markov P for the given language."""
-    data: DefaultLangData = _get_data_latin(langcode, path)
-    tokens2token_scp3: SequentialConditionalP = _constant_scp3(
-        0.5  # FIXME: This is probably very wrong!
-    )
-    token2char_scp3: SequentialConditionalP = _constant_scp3(
-        1 / data.token_lexicon.n_obs
-    )
-    chars2char_scp3: SequentialConditionalP = _constant_scp3(
-        0.5  # FIXME: This is probably very wrong!
-    )
-    char2nothing_scp3: SequentialConditionalP = _constant_scp3(
-        1 / data.char_lexicon.n_obs
-    )
-    return collapser(
-        cpf(
-            cpf(
-                mpf.default(data.token_context_lexicon),
-                spf(data.token_lexicon),
+def _markov(data: DefaultLangData, c: _Combinators, cache: Optional[LRUCache]) -> Any:
+    tokens2token_scp3 = c.constant(TOKENS2TOKEN)
+    token2char_scp3 = c.constant(1 / data.token_lexicon.n_obs)
+    chars2char_scp3 = c.constant(CHARS2CHAR)
+    char2nothing_scp3 = c.constant(1 / data.char_lexicon.n_obs)
+    return c.collapser(
+        c.cpf(
+            c.cpf(
+                c.mpf(data.token_context_lexicon),
+                c.spf(data.token_lexicon),
                 tokens2token_scp3,
                 latin_tokens,
             ),
-            cpf(
-                mpf.default(data.char_context_lexicon),
-                cpf(
-                    spf(data.char_lexicon),
-                    _constant_scp3(1),
+            c.cpf(
+                c.mpf(data.char_context_lexicon),
+                c.cpf(
+                    c.spf(data.char_lexicon),
+                    c.constant(1),
                     char2nothing_scp3,
                     characters,
                 ),
@@ -77,6 +118,45 @@ def markov(langcode: str, path=DEFAULT_DATA_PATH) -> P:
             ),
             token2char_scp3,
             characters,
+            cache,
         ),
         latin_tokens,
     )
+
+
+def stateless(
+    langcode: str, path=DEFAULT_DATA_PATH, cache: Optional[LRUCache] = None
+) -> P:
+    """Returns the default stateless P for the given language.
+    :param cache: A cache in which to memoize the probabilities of out-of-vocabulary
+        tokens, or None
+    """
+    return _stateless(_get_data_latin(langcode, path), _LINEAR, cache)
+
+
+def markov(
+    langcode: str, path=DEFAULT_DATA_PATH, cache: Optional[LRUCache] = None
+) -> P:
+    """Returns the default markov P for the given language.
+    :param cache: A cache in which to memoize the probabilities of tokens that are
+        not in the token model, or None
+    """
+    return _markov(_get_data_latin(langcode, path), _LINEAR, cache)
+
+
+def log_stateless(
+    langcode: str, path=DEFAULT_DATA_PATH, cache: Optional[LRUCache] = None
+) -> LogP:
+    """Returns the log of the default stateless P for the given language. Unlike the
+    stateless P, it does not underflow on long strings.
+    """
+    return _stateless(_get_data_latin(langcode, path), _LOG, cache)
+
+
+def log_markov(
+    langcode: str, path=DEFAULT_DATA_PATH, cache: Optional[LRUCache] = None
+) -> LogP:
+    """Returns the log of the default markov P for the given language. Unlike the
+    markov P, it does not underflow on long strings.
+    """
+    return _markov(_get_data_latin(langcode, path), _LOG, cache)
@@ -0,0 +1,178 @@
+"""This module instruments a P that was assembled from the combinators in common.py and
+mpf.py, so that it can be seen where the time of a call goes and where fallbacks happen.
+
+Instrumentation costs nothing unless it is used: `instrument` returns a new P with the
+same structure, in which each SCP records statistics whenever it is called. The P that
+was instrumented is not changed, so it can go on serving traffic at full speed while
+its instrumented twin profiles a sample of that traffic.
+
+Each node of the tree is named by its path from the root. The root is "p", the SCP
+that a collapser at path x collapses is "x.scp", and the SCPs of a cpf at path x are
+"x.scp1", "x.scp2", and "x.scp3". In the default markov P (see defaults.py), for
+example, "p.scp" falls back from tokens to chars, and "p.scp.scp1" falls back from the
+token Markov model to the token unigram model.
+
+Combinators that are not recognized (see `annotated` in common.py) are timed and
+counted as opaque SCPs. Constant SCPs are not instrumented.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from textprobability.core.common import collapser, cpf, log_collapser, log_cpf
+
+# Called after each call of each instrumented node with its path, its input (a string
+# for a collapser, and a sequence of units otherwise), its output, and the time taken.
+Hook = Callable[[str, Any, Any, float], None]
+
+_REBUILT: Dict[str, Callable[..., Any]] = {
+    "collapser": collapser,
+    "log_collapser": log_collapser,
+    "cpf": cpf,
+    "log_cpf": log_cpf,
+}
+
+
+class NodeStats:
+    """The statistics of one node of an instrumented P."""
+
+    __slots__ = ("kind", "calls", "units", "undefined", "seconds")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.calls = 0
+        # The number of units whose probabilities were requested. For a collapser, this
+        # is the number of strings.
+        self.units = 0
+        # The number of those units whose probabilities were undefined (misses).
+        self.undefined = 0
+        # The time spent in this node, including the time spent in its children.
+        self.seconds = 0.0
+
+    @property
+    def hits(self) -> int:
+        return self.units - self.undefined
+
+
+class Stats:
+    """The statistics of all nodes of an instrumented P, keyed by path."""
+
+    def __init__(self) -> None:
+        self.nodes: Dict[str, NodeStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, node: NodeStats, units: int, undefined: int, seconds: float
+    ) -> None:
+        with self._lock:
+            node.calls += 1
+            node.units += units
+            node.undefined += undefined
+            node.seconds += seconds
+
+    def fallbacks(self, path: str) -> int:
+        """Returns the number of times that the cpf at `path` fell back to its second
+        SCP because its first SCP was undefined.
+        """
+        node = self.nodes.get(path + ".scp1")
+        return 0 if node is None else node.undefined
+
+    def reset(self) -> None:
+        with self._lock:
+            for node in self.nodes.values():
+                node.calls = node.units = node.undefined = 0
+                node.seconds = 0.0
+
+    def report(self) -> str:
+        """Returns a table of the statistics of each node."""
+        lines = [
+            "{:<28} {:<14} {:>9} {:>11} {:>8} {:>10} {:>10}".format(
+                "path", "kind", "calls", "units", "hits", "fallbacks", "seconds"
+            )
+        ]
+        for path, node in self.nodes.items():
+            lines.append(
+                "{:<28} {:<14} {:>9} {:>11} {:>8} {:>10} {:>10.4f}".format(
+                    path,
+                    node.kind,
+                    node.calls,
+                    node.units,
+                    "{:.1%}".format(node.hits / node.units) if node.units else "",
+                    self.fallbacks(path) if node.kind.endswith("cpf") else "",
+                    node.seconds,
+                )
+            )
+        return "\n".join(lines)
+
+
+class InstrumentedP:
+    """A P that computes exactly what another P computes, and records statistics about
+    each of its nodes in `stats`.
+    """
+
+    def __init__(
+        self, p: Callable[[str], Optional[float]], hook: Optional[Hook] = None
+    ):
+        """:param p: A P or LogP assembled from the combinators in common.py and mpf.py
+        :param hook: A function to call after each call of each node, or None
+        """
+        self.stats = Stats()
+        self.hook = hook
+        self._p = self._instrument(p, "p")
+
+    def _instrument(self, f: Any, path: str) -> Any:
+        structure: Any = getattr(f, "structure", None)
+        kind = "opaque" if structure is None else structure[0]
+        if kind == "constant":
+            return f
+        if kind in ("collapser", "log_collapser"):
+            scp, splitter = structure[1]
+            f = _REBUILT[kind](self._instrument(scp, path + ".scp"), splitter)
+        elif kind in ("cpf", "log_cpf"):
+            scp1, scp2, scp3, splitter, cache = structure[1]
+            f = _REBUILT[kind](
+                self._instrument(scp1, path + ".scp1"),
+                self._instrument(scp2, path + ".scp2"),
+                self._instrument(scp3, path + ".scp3"),
+                splitter,
+                cache,
+            )
+        return self._timed(f, path, kind)
+
+    def _timed(self, f: Any, path: str, kind: str) -> Any:
+        node = self.stats.nodes[path] = NodeStats(kind)
+        record, hook, perf_counter = self.stats.record, self.hook, time.perf_counter
+        if kind.endswith("collapser"):
+
+            def collapsed(string: str) -> Optional[float]:
+                t0 = perf_counter()
+                ret = f(string)
+                seconds = perf_counter() - t0
+                record(node, 1, ret is None, seconds)
+                if hook is not None:
+                    hook(path, string, ret, seconds)
+                return ret
+
+            return collapsed
+
+        def scp(sequence: Any) -> List[Optional[float]]:
+            t0 = perf_counter()
+            ret = f(sequence)
+            seconds = perf_counter() - t0
+            record(node, len(ret), ret.count(None), seconds)
+            if hook is not None:
+                hook(path, sequence, ret, seconds)
+            return ret
+
+        return scp
+
+    def __call__(self, string: str) -> Optional[float]:
+        return self._p(string)
+
+
+def instrument(
+    p: Callable[[str], Optional[float]], hook: Optional[Hook] = None
+) -> InstrumentedP:
+    """Returns an instrumented copy of `p`. See `InstrumentedP`."""
+    return InstrumentedP(p, hook)
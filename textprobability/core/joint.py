@@ -0,0 +1,159 @@
+"""This module scores strings under the default markov Ps (see defaults.py) of several
+languages at once.
+
+Each string is tokenized once. The units of all languages share one space of IDs, so a
+single lookup retrieves the probabilities that every language assigns to a unit, and the
+fallbacks and products are NumPy operations over a (units x languages) array. The cost
+of scoring a string therefore grows with its length, and hardly at all with the number
+of languages.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from textprobability.core.batch import _positions, _products, _split
+from textprobability.core.defaults import (
+    _get_data_latin,
+    CHARS2CHAR,
+    DEFAULT_DATA_PATH,
+    TOKENS2TOKEN,
+)
+from textprobability.core.splitters import latin_tokens
+from textprobability.core.types import ContextLexicon, Lexicon, NGram, Unit
+from textprobability.data.langdata import DefaultLangData
+
+
+class _JointLevel:
+    """Holds the lexicons and context lexicons of one level of linguistic unit for
+    several languages, with one column per language.
+    """
+
+    def __init__(
+        self, lexicons: Sequence[Lexicon], context_lexicons: Sequence[ContextLexicon]
+    ):
+        n_languages = len(lexicons)
+        serializables = [lexicon.to_serializable() for lexicon in lexicons]
+        self.ids: Dict[Unit, int] = {}
+        for counts, _ in serializables:
+            for unit in counts:
+                self.ids.setdefault(unit, len(self.ids))
+        # Units that are not in the vocabulary get the ID `self.unknown`.
+        self.unknown = len(self.ids)
+        self.p = np.full((self.unknown + 1, n_languages), np.nan)
+        for language, (counts, n_obs) in enumerate(serializables):
+            for unit, count in counts.items():
+                self.p[self.ids[unit], language] = count / n_obs
+        # Each (context, unit) pair is keyed by the n-gram that it forms, so that
+        # languages with contexts of different lengths can share one table.
+        self._rows: Dict[NGram, int] = {}
+        entries: List[Tuple[int, int, float]] = []
+        key_lens = set()
+        for language, cl in enumerate(context_lexicons):
+            for context in cl:
+                key_lens.add(len(context))
+                entry_counts, n_obs = cl[context].to_serializable()
+                for unit, count in entry_counts.items():
+                    row = self._rows.setdefault((*context, unit), len(self._rows))
+                    entries.append((row, language, count / n_obs))
+        self._key_lens = sorted(key_lens)
+        self._conditional_p = np.full((len(self._rows) + 1, n_languages), np.nan)
+        for row, language, p in entries:
+            self._conditional_p[row, language] = p
+
+    def encode(self, units: Sequence[Unit]) -> np.ndarray:
+        """Returns the IDs of `units`."""
+        return np.fromiter(
+            (self.ids.get(unit, self.unknown) for unit in units),
+            dtype=np.int64,
+            count=len(units),
+        )
+
+    def conditional(self, units: Sequence[Unit], positions: np.ndarray) -> np.ndarray:
+        """Returns the probability of each unit given the units that precede it, in
+        each language, or NaN where that is undefined.
+        :param units: A concatenation of sequences of units
+        :param positions: The position of each unit in its own sequence
+        """
+        missing = len(self._rows)
+        ret = self._conditional_p[np.full(len(units), missing)]
+        # Longer contexts are tried first, so that a language whose contexts vary in
+        # length (see `BackoffContextLexicon`) backs off from longer ones to shorter.
+        for key_len in reversed(self._key_lens):
+            rows = np.fromiter(
+                (
+                    (
+                        self._rows.get(tuple(units[i - key_len : i + 1]), missing)
+                        if position >= key_len
+                        else missing
+                    )
+                    for i, position in enumerate(positions)
+                ),
+                dtype=np.int64,
+                count=len(units),
+            )
+            ret = np.where(np.isnan(ret), self._conditional_p[rows], ret)
+        return ret
+
+
+class JointMarkov:
+    """Computes the default markov P of several languages in one pass."""
+
+    def __init__(self, data: Dict[str, DefaultLangData]):
+        """:param data: A map from BCP-47 language codes to language data"""
+        self.langcodes = list(data)
+        values = [data[langcode] for langcode in self.langcodes]
+        self._tokens = _JointLevel(
+            [d.token_lexicon for d in values], [d.token_context_lexicon for d in values]
+        )
+        self._chars = _JointLevel(
+            [d.char_lexicon for d in values], [d.char_context_lexicon for d in values]
+        )
+        self._token2char = np.array([1 / d.token_lexicon.n_obs for d in values])
+        self._char2nothing = np.array([1 / d.char_lexicon.n_obs for d in values])
+
+    def score_many(self, strings: Sequence[str]) -> np.ndarray:
+        """Returns an array whose rows correspond to `strings` and whose columns
+        correspond to `self.langcodes`. Undefined probabilities are NaN.
+        """
+        units, lengths = _split([latin_tokens(s) for s in strings])
+        tokens, chars = self._tokens, self._chars
+        conditional = tokens.conditional(units, _positions(lengths))
+        p = np.where(
+            np.isnan(conditional),
+            tokens.p[tokens.encode(units)] * TOKENS2TOKEN,
+            conditional * (1 - TOKENS2TOKEN),
+        )
+        oov = np.isnan(p)
+        p = np.where(oov, p, p * (1 - self._token2char))
+        oov_tokens = np.flatnonzero(oov.any(axis=1))
+        # Tokens contain no whitespace, so each character of an OOV token is its own
+        # sole latin token.
+        oov_units, oov_lengths = _split([units[i] for i in oov_tokens])
+        char_conditional = chars.conditional(oov_units, _positions(oov_lengths))
+        unigram = chars.p[chars.encode(oov_units)]
+        unigram = np.where(
+            np.isnan(unigram), self._char2nothing, unigram * (1 - self._char2nothing)
+        )
+        char_p = np.where(
+            np.isnan(char_conditional),
+            unigram * CHARS2CHAR,
+            char_conditional * (1 - CHARS2CHAR),
+        )
+        fallback = _products(char_p, oov_lengths) * self._token2char
+        p[oov_tokens] = np.where(oov[oov_tokens], fallback, p[oov_tokens])
+        return _products(p, lengths)
+
+    def __call__(self, string: str) -> Dict[str, Optional[float]]:
+        """Returns the probability of `string` in each language."""
+        return {
+            langcode: None if np.isnan(p) else float(p)
+            for langcode, p in zip(self.langcodes, self.score_many([string])[0])
+        }
+
+
+def joint_markov(langcodes: Sequence[str], path=DEFAULT_DATA_PATH) -> JointMarkov:
+    """Returns the default markov Ps of the given languages, joined."""
+    return JointMarkov(
+        {langcode: _get_data_latin(langcode, path) for langcode in langcodes}
+    )
@@ -1,10 +1,29 @@
 """Implements a buildable, serializable, deserializable lexicon."""
 
-
-from typing import Any, Dict, Iterator, Tuple, Union, Optional
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from copy import deepcopy
+from math import log
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableSequence,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    Optional,
+)
 from textprobability.core.types import (
     Unit,
     Probability,
+    LogProbability,
     NGram,
     ContextLexicon,
     Splitter,
@@ -17,29 +36,127 @@ SerializableLexicon = Tuple[Dict[Unit, int], int]
 SerializableContextLexicon = Dict[str, Union[SerializableLexicon, Any]]
 
 
+class _Vocabulary:
+    """Assigns a small integer ID to each distinct linguistic unit. IDs are shared by
+    all LexiconImpls, so that each unit is stored only once however many lexicons hold
+    it.
+    """
+
+    def __init__(self) -> None:
+        self.ids: Dict[Unit, int] = {}
+        self.units: List[Unit] = []
+        self._lock = threading.Lock()
+
+    def intern(self, unit: Unit) -> int:
+        """Returns the ID of `unit`, assigning one if it has none."""
+        ret = self.ids.get(unit)
+        if ret is None:
+            with self._lock:
+                ret = self.ids.get(unit)
+                if ret is None:
+                    ret = self.ids[unit] = len(self.units)
+                    self.units.append(unit)
+        return ret
+
+
+_VOCABULARY = _Vocabulary()
+
+
+def _typecode(largest: int) -> str:
+    """Returns the typecode of the smallest array items that can hold nonnegative
+    integers up to `largest`.
+    """
+    for typecode in ("B", "H", "I"):
+        if largest < 1 << (8 * array(typecode).itemsize):
+            return typecode
+    return "q"
+
+
+def _compact(values: Sequence[int]) -> array:
+    """Returns an array of `values` whose items are as small as possible."""
+    return array(_typecode(max(values, default=0)), values)
+
+
 class LexiconImpl(Lexicon):
     """A Lexicon associates linguistic units with probabilities."""
 
-    # A Lexicon is backed by a _Probabilities instance.
+    # A LexiconImpl is backed by a single typed array, which holds the IDs of its units
+    # in ascending order, then their counts in the same order, and then (unless it is
+    # the same as the order of the IDs) the rank of the ID of each unit in the order in
+    # which the units were given, so that serialization is stable. Probabilities are
+    # computed from counts as they are needed, so they are exactly what they would be
+    # if they were stored. Log-probabilities are computed once, on first use, into an
+    # array of doubles beside the store.
+    __slots__ = ("_store", "_size", "_logs")
 
     def __init__(self, counts: Dict[Unit, int], n_obs: int):
         """This constructor should never be called from outside this module. In Java it
         would be private.
         """
-        self._counts: Dict[Unit, int] = counts
-        self._probabilities: Dict[Unit, float] = {
-            k: v / n_obs for k, v in counts.items()
-        }
+        ids = [_VOCABULARY.intern(unit) for unit in counts]
+        values = list(counts.values())
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        store = [ids[i] for i in order] + [values[i] for i in order]
+        if order != sorted(order):
+            ranks = [0] * len(order)
+            for rank, i in enumerate(order):
+                ranks[i] = rank
+            store.extend(ranks)
+        self._store = _compact(store)
+        self._size = len(ids)
+        self._logs: Optional[array] = None
         super().__init__(n_obs)
 
+    def _index(self, key: Unit) -> int:
+        """Returns the index of the ID of `key` in `self._store`, or -1 if `key` is
+        absent.
+        """
+        unit_id = _VOCABULARY.ids.get(key)
+        if unit_id is None:
+            return -1
+        store, size = self._store, self._size
+        i = bisect_left(store, unit_id, 0, size)
+        return i if i < size and store[i] == unit_id else -1
+
     def __getitem__(self, key: Unit) -> Probability:
         """Returns the probability associated with `key`."""
-        return self._probabilities[key]
+        i = self._index(key)
+        if i == -1:
+            raise KeyError(key)
+        return self._store[self._size + i] / self.n_obs
 
     def get(
         self, key: Unit, default: Optional[Probability] = None
     ) -> Optional[Probability]:
-        return self._probabilities[key] if key in self._probabilities else default
+        i = self._index(key)
+        return default if i == -1 else self._store[self._size + i] / self.n_obs
+
+    def log_get(
+        self, key: Unit, default: Optional[LogProbability] = None
+    ) -> Optional[LogProbability]:
+        i = self._index(key)
+        if i == -1:
+            return default
+        logs = self._logs
+        if logs is None:
+            # Two threads may compute this at once, but they compute the same thing.
+            logs = self._logs = array(
+                "d",
+                (
+                    log(count / self.n_obs) if count > 0 else float("-inf")
+                    for count in self._store[self._size : 2 * self._size]
+                ),
+            )
+        return logs[i]
+
+    def counts(self) -> Iterator[Tuple[Unit, int]]:
+        """Iterates over the units of `self` and their counts, in the order in which
+        they were given.
+        """
+        units, store, size = _VOCABULARY.units, self._store, self._size
+        order = store[2 * size :] if len(store) > 2 * size else range(size)
+        for i in order:
+            yield units[store[i]], store[size + i]
 
     def summarize(self, min_n):
         """Summarizes this, reducing the amount of space required to store
@@ -48,25 +165,683 @@ class LexiconImpl(Lexicon):
         it to be recorded as observed.
         :return: A summarized version of this.
         """
-        filtered = {
-            unit: count for unit, count in self._counts.items() if count >= min_n
-        }
+        filtered = {unit: count for unit, count in self.counts() if count >= min_n}
         # sum(filtered.values()) should be very close to self.n_obs for reasonably
         # chosen min_n, but it is recomputed here anyway.
         return LexiconImpl(filtered, sum(filtered.values()))
 
     def to_serializable(self) -> SerializableLexicon:
         """Gets a representation of `self` that can be serialized using JSON."""
-        return (self._counts, self.n_obs)
+        return (dict(self.counts()), self.n_obs)
 
     @classmethod
     def from_serializable(cls, serializable: SerializableLexicon) -> Any:
         """Retrieves a Lexicon from its serializable representation."""
         return cls(*serializable)
 
+    def __reduce__(self):
+        # Unit IDs are meaningful only within one process.
+        return LexiconImpl.from_serializable, (self.to_serializable(),)
+
+
+_T = TypeVar("_T", bound="_Trie")
+# Odd multipliers that scatter the parents and keys of the nodes of a _Trie.
+_PARENT_MULTIPLIER = 0x9E3779B1
+_UNIT_MULTIPLIER = 0x85EBCA77
+
+
+class _FlatEntries(Lexicon):
+    """The Lexicon that follows a single context in a FlatContextLexicon."""
+
+    __slots__ = ("_cl", "_node")
+
+    def __init__(self, cl: "_Trie", node: int):
+        self._cl = cl
+        self._node = node
+        super().__init__(cl._counts[node])
+
+    def _count(self, key: Unit) -> int:
+        unit_id = _VOCABULARY.ids.get(key)
+        if unit_id is None:
+            return -1
+        child = self._cl._child(self._node, unit_id)
+        return -1 if child == -1 else self._cl._counts[child]
+
+    def __getitem__(self, key: Unit) -> Probability:
+        count = self._count(key)
+        if count == -1:
+            raise KeyError(key)
+        return count / self.n_obs
+
+    def get(
+        self, key: Unit, default: Optional[Probability] = None
+    ) -> Optional[Probability]:
+        count = self._count(key)
+        return default if count == -1 else count / self.n_obs
+
+    def counts(self) -> Iterator[Tuple[Unit, int]]:
+        """Iterates over the units that follow the context and their counts, in the
+        order in which they were given.
+        """
+        cl, units = self._cl, _VOCABULARY.units
+        # The entries of a context are the nodes that immediately follow it.
+        child = self._node + 1
+        while child < len(cl._parents) and cl._parents[child] == self._node:
+            yield units[cl._units[child]], cl._counts[child]
+            child += 1
+
+    def summarize(self, min_n) -> LexiconImpl:
+        """See `LexiconImpl.summarize`."""
+        return LexiconImpl(dict(self.counts()), self.n_obs).summarize(min_n)
+
+    def to_serializable(self) -> SerializableLexicon:
+        return (dict(self.counts()), self.n_obs)
+
+
+def _thawed(
+    cls: Callable[[], _T],
+    attributes: Dict[str, Any],
+    units: List[Unit],
+    arrays: Tuple[array, array, array, array],
+) -> _T:
+    """Returns a _Trie of type `cls` with the `attributes` and `arrays` of a frozen one
+    (see `_Trie.__reduce__`).
+    """
+    ids = [_VOCABULARY.intern(unit) for unit in units]
+    trie = cls()
+    trie.__dict__.update(attributes)
+    trie._parents, keys, counts, trie._contexts = arrays
+    shift = trie._KEY_SHIFT
+    tag = (1 << shift) - 1
+    trie._units = array(
+        "q", [0, *(ids[key >> shift] << shift | key & tag for key in keys[1:])]
+    )
+    trie._freeze(counts)
+    return trie
+
+
+class _Trie(Mapping):
+    """A trie that is stored in flat arrays. Each node of the trie is identified by its
+    index in the arrays that hold its parent and its key. The children of a node are
+    found in an open-addressing hash table of node indices, keyed by (parent, key), so
+    a lookup takes constant time.
+    """
+
+    # The keys of the nodes are held in `_units`, since FlatContextLexicon keys its
+    # nodes by the IDs of their units.
+    _parents: array
+    _units: array
+    _counts: array
+    _contexts: array
+    _table: array
+    # The number of bits by which the ID of a unit is shifted in the key of its node
+    _KEY_SHIFT = 0
+
+    def _slot(self, parent: int, key: int) -> int:
+        return (parent * _PARENT_MULTIPLIER ^ key * _UNIT_MULTIPLIER) & (
+            len(self._table) - 1
+        )
+
+    def _child(self, parent: int, key: int) -> int:
+        """Returns the child of `parent` whose key is `key`, or -1 if there is none."""
+        table, parents, keys = self._table, self._parents, self._units
+        mask = len(table) - 1
+        i = self._slot(parent, key)
+        while True:
+            node = table[i]
+            if node == 0:  # The root is no node's child, so 0 marks an empty slot.
+                return -1
+            if keys[node] == key and parents[node] == parent:
+                return node
+            i = (i + 1) & mask
+
+    def _insert(self, parent: int, key: int, counts: MutableSequence[int]) -> int:
+        """Adds a child to `parent`, and returns it."""
+        node = len(self._parents)
+        self._parents.append(parent)
+        self._units.append(key)
+        counts.append(0)
+        if 2 * node >= len(self._table):
+            self._rehash(2 * len(self._table))
+        else:
+            self._place(node)
+        return node
+
+    def _rehash(self, size: int) -> None:
+        """Replaces the hash table with one of `size` slots, a power of 2."""
+        table = self._table = array(_typecode(size), [0]) * size
+        mask = size - 1
+        # This inlines `self._place`, which is the bottleneck.
+        for node in range(1, len(self._parents)):
+            i = (
+                self._parents[node] * _PARENT_MULTIPLIER
+                ^ self._units[node] * _UNIT_MULTIPLIER
+            ) & mask
+            while table[i] != 0:
+                i = (i + 1) & mask
+            table[i] = node
+
+    def _place(self, node: int) -> None:
+        table = self._table
+        mask = len(table) - 1
+        i = self._slot(self._parents[node], self._units[node])
+        while table[i] != 0:
+            i = (i + 1) & mask
+        table[i] = node
+
+    def _freeze(self, counts: Sequence[int]) -> None:
+        """Stores the arrays of the complete trie, with the count of each node, as
+        compactly as they can be stored.
+        """
+        self._counts = _compact(counts)
+        self._parents = _compact(self._parents)
+        self._units = _compact(self._units)
+        self._contexts = _compact(self._contexts)
+        # The table is made as small as it can be with a load factor of at most 0.6.
+        size = 8
+        while 3 * size < 5 * len(self._parents):
+            size *= 2
+        self._rehash(size)
+
+    def _add(
+        self,
+        ngram: NGram,
+        entries: Dict[Unit, int],
+        n_obs: int,
+        counts: MutableSequence[int],
+    ) -> None:
+        """Adds the context `ngram`, which was observed `n_obs` times and is followed
+        by `entries`, given the count of each node so far.
+        """
+        raise NotImplementedError()
+
+    def _context(self, ngram: NGram) -> int:
+        """Returns the node of the context `ngram`, or -1 if it is not a context."""
+        raise NotImplementedError()
+
+    def _entry_key(self, unit_id: int) -> int:
+        """Returns the key of the node of an entry for the unit with ID `unit_id`."""
+        return unit_id
+
+    def _is_entry(self, key: int) -> bool:
+        """Returns whether a child of a context whose key is `key` is an entry."""
+        return True
+
+    def _merged(self: _T, other: ContextLexicon) -> _T:
+        """Returns the merge of `self` and `other` (see `merge_context_lexicons`). The
+        nodes of `self` are copied, with the counts of `other` added to them and the new
+        entries of each context placed after its old ones, and then the contexts that
+        are only in `other` are added.
+        """
+        # The counts that `other` adds to contexts of `self`, keyed by their nodes
+        updates: Dict[int, Tuple[Dict[int, int], int]] = {}
+        new: List[NGram] = []
+        for ngram in other:
+            node = self._context(ngram)
+            if node == -1:
+                new.append(ngram)
+                continue
+            entries, n_obs = other[ngram].to_serializable()
+            updates[node] = (
+                {
+                    self._entry_key(_VOCABULARY.intern(unit)): count
+                    for unit, count in entries.items()
+                },
+                n_obs,
+            )
+        ret = type(self)()
+        # This copies the length of the contexts. The arrays are replaced below.
+        ret.__dict__.update(vars(self))
+        old_parents, old_keys, old_counts = self._parents, self._units, self._counts
+        old_contexts = self._contexts  # These are in ascending order.
+        parents, keys = array("I", [0]), array("I", [0])
+        counts = array("q", [0])
+        contexts = array("I")
+        # The node of the copy of each node of `self`
+        copies = array("I", [0]) * len(old_parents)
+        old = 1
+        while old < len(old_parents):
+            node = copies[old] = len(parents)
+            parents.append(copies[old_parents[old]])
+            keys.append(old_keys[old])
+            counts.append(old_counts[old])
+            context, old = old, old + 1
+            if (
+                len(contexts) == len(old_contexts)
+                or old_contexts[len(contexts)] != context
+            ):
+                continue
+            contexts.append(node)
+            update = updates.get(context)
+            if update is None:
+                continue
+            additions, n_obs = update
+            counts[node] += n_obs
+            # The entries of a context immediately follow it.
+            while (
+                old < len(old_parents)
+                and old_parents[old] == context
+                and self._is_entry(old_keys[old])
+            ):
+                parents.append(node)
+                keys.append(old_keys[old])
+                counts.append(old_counts[old] + additions.pop(old_keys[old], 0))
+                old += 1
+            for key, count in additions.items():
+                parents.append(node)
+                keys.append(key)
+                counts.append(count)
+        ret._parents, ret._units, ret._contexts = parents, keys, contexts
+        if new:
+            # New contexts are found and inserted through the hash table.
+            size = 8
+            while size <= 2 * len(parents):
+                size *= 2
+            ret._rehash(size)
+        for ngram in sorted(new, key=len):
+            entries, n_obs = other[ngram].to_serializable()
+            ret._add(ngram, entries, n_obs, counts)
+        ret._freeze(counts)
+        return ret
+
+    def __reduce__(self):
+        # Unit IDs are meaningful only within one process, so the keys are stored with
+        # IDs that index the units that they stand for, and the trie is rehashed when
+        # it is loaded. This is much faster than building it again.
+        shift = self._KEY_SHIFT
+        tag = (1 << shift) - 1
+        ids = sorted({key >> shift for key in self._units[1:]})
+        local = {unit_id: i for i, unit_id in enumerate(ids)}
+        keys = _compact(
+            [0, *(local[key >> shift] << shift | key & tag for key in self._units[1:])]
+        )
+        units = _VOCABULARY.units
+        return _thawed, (
+            type(self),
+            {name: value for name, value in vars(self).items() if name[0] != "_"},
+            [units[unit_id] for unit_id in ids],
+            (self._parents, keys, self._counts, self._contexts),
+        )
+
+
+class FlatContextLexicon(_Trie):
+    """A ContextLexicon that is stored in a few flat arrays, without any Python objects
+    for its contexts or units.
+
+    The contexts and the units that follow them form a trie. Each node of the trie is
+    identified by its index in the arrays that hold its parent, the ID of its unit (see
+    `_Vocabulary`), and its count: the number of observations of the context, for a
+    context, or of the unit after its context, for an entry. The children of a node
+    are found in an open-addressing hash table of node indices, keyed by (parent, unit
+    ID), so a lookup takes constant time. The entries of each context immediately
+    follow it.
+    """
+
+    def __init__(self, items: Iterable[Tuple[NGram, SerializableLexicon]] = ()):
+        """:param items: Pairs of contexts and the serializable representations of the
+        Lexicons that follow them
+        """
+        self.n = 0  # The length of the contexts
+        # Node 0 is the root, which stands for the empty context.
+        self._parents = array("I", [0])
+        self._units = array("I", [0])
+        counts = [0]
+        self._contexts = array("I")
+        self._rehash(8)
+        for ngram, (entries, n_obs) in items:
+            self._add(ngram, entries, n_obs, counts)
+        self._freeze(counts)
+
+    def _add(
+        self,
+        ngram: NGram,
+        entries: Dict[Unit, int],
+        n_obs: int,
+        counts: MutableSequence[int],
+    ) -> None:
+        if not self._contexts:
+            self.n = len(ngram)
+        elif len(ngram) != self.n:
+            raise ValueError("All contexts must have the same length.")
+        # Each context is new, so the last node of its path is created for it.
+        node, is_new = 0, not self._contexts
+        for unit in ngram:
+            unit_id = _VOCABULARY.intern(unit)
+            child = self._child(node, unit_id)
+            is_new = child == -1
+            node = self._insert(node, unit_id, counts) if is_new else child
+        if not is_new:
+            raise ValueError("The context {} is repeated.".format(ngram))
+        counts[node] = n_obs
+        self._contexts.append(node)
+        for unit, count in entries.items():
+            child = self._insert(node, _VOCABULARY.intern(unit), counts)
+            counts[child] = count
+
+    def _context(self, ngram: NGram) -> int:
+        if not self._contexts or len(ngram) != self.n:
+            return -1
+        return self._node(ngram)
+
+    def _node(self, ngram: Sequence[Unit]) -> int:
+        """Returns the node of `ngram`, or -1 if there is none."""
+        node = 0
+        for unit in ngram:
+            unit_id = _VOCABULARY.ids.get(unit)
+            if unit_id is None:
+                return -1
+            node = self._child(node, unit_id)
+            if node == -1:
+                return -1
+        return node
+
+    def __getitem__(self, ngram: NGram) -> Lexicon:
+        if not isinstance(ngram, tuple) or len(ngram) != self.n:
+            raise KeyError(ngram)
+        node = self._node(ngram)
+        if node == -1 or not self._contexts:
+            raise KeyError(ngram)
+        return _FlatEntries(self, node)
+
+    def __iter__(self) -> Iterator[NGram]:
+        units = _VOCABULARY.units
+        for node in self._contexts:
+            ngram = []
+            while node:
+                ngram.append(units[self._units[node]])
+                node = self._parents[node]
+            yield tuple(reversed(ngram))
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def get_conditional(
+        self, context: Sequence[Unit], unit: Unit, default: Optional[Probability] = None
+    ) -> Optional[Probability]:
+        """Returns the probability of `unit` given `context`, or `default` if it is
+        not recorded. This is equivalent to `self[tuple(context)].get(unit, default)`
+        when `context` is recorded.
+        """
+        if len(context) != self.n:
+            return default
+        node = self._node((*context, unit))
+        if node == -1:
+            return default
+        return self._counts[node] / self._counts[self._parents[node]]
+
+    def log_get_conditional(
+        self,
+        context: Sequence[Unit],
+        unit: Unit,
+        default: Optional[LogProbability] = None,
+    ) -> Optional[LogProbability]:
+        """Returns the log-probability of `unit` given `context`, or `default`."""
+        p = self.get_conditional(context, unit)
+        if p is None:
+            return default
+        return log(p) if p > 0 else float("-inf")
+
+    def conditionals(self, sequence: Sequence[Unit]) -> List[Optional[Probability]]:
+        """Returns the probability of each unit of `sequence` given the `self.n` units
+        that precede it, or None where that is not recorded, as `mpf.default` does.
+        """
+        # This inlines `self._child`, which is the bottleneck.
+        n, table, parents, units, counts = (
+            self.n,
+            self._table,
+            self._parents,
+            self._units,
+            self._counts,
+        )
+        mask = len(table) - 1
+        get_id = _VOCABULARY.ids.get
+        ids = [get_id(unit, -1) for unit in sequence]
+        ret: List[Optional[Probability]] = [None] * n
+        for i in range(n, len(ids)):
+            node = 0
+            for unit_id in ids[i - n : i + 1]:
+                if unit_id == -1:
+                    node = 0
+                    break
+                slot = (node * _PARENT_MULTIPLIER ^ unit_id * _UNIT_MULTIPLIER) & mask
+                parent, node = node, table[slot]
+                while node and (units[node] != unit_id or parents[node] != parent):
+                    slot = (slot + 1) & mask
+                    node = table[slot]
+                if not node:
+                    break
+            # The root is no node's child, so a node of 0 means that there is none.
+            ret.append(counts[node] / counts[parents[node]] if node else None)
+        return ret
+
+    def log_conditionals(
+        self, sequence: Sequence[Unit]
+    ) -> List[Optional[LogProbability]]:
+        """Returns the logarithms of `self.conditionals(sequence)`."""
+        return [
+            None if p is None else log(p) if p > 0 else float("-inf")
+            for p in self.conditionals(sequence)
+        ]
+
+
+class _BackoffEntries(_FlatEntries):
+    """The Lexicon that follows a single context in a BackoffContextLexicon."""
+
+    __slots__ = ()
+
+    def _count(self, key: Unit) -> int:
+        unit_id = _VOCABULARY.ids.get(key)
+        if unit_id is None:
+            return -1
+        child = self._cl._child(self._node, 2 * unit_id + 1)
+        return -1 if child == -1 else self._cl._counts[child]
+
+    def counts(self) -> Iterator[Tuple[Unit, int]]:
+        cl, units = self._cl, _VOCABULARY.units
+        # The entries of a context immediately follow it. Its children that are
+        # contexts, whose keys are even, come later.
+        child = self._node + 1
+        while (
+            child < len(cl._parents)
+            and cl._parents[child] == self._node
+            and cl._units[child] & 1
+        ):
+            yield units[cl._units[child] >> 1], cl._counts[child]
+            child += 1
+
+
+class BackoffContextLexicon(_Trie):
+    """A ContextLexicon whose contexts may have any length up to `order`, for Markov
+    models that back off from the longest context after which a unit was observed to
+    shorter ones.
+
+    The contexts are stored in a suffix trie: the path to a context runs from its last
+    unit to its first, so the contexts that end at any position of a sequence lie on one
+    path, and a context of length k costs one node more than its suffix of length k - 1.
+    The key of a node is twice the ID of its unit (see `_Vocabulary`) for a context, and
+    one more than that for an entry, so that the entries of a context and the longer
+    contexts that it ends can share it as a parent. Every suffix of a context must also
+    be a context, as it is in any ContextLexicon built from counts. As in a
+    FlatContextLexicon, the entries of each context immediately follow it.
+    """
+
+    _KEY_SHIFT = 1
+
+    def __init__(self, items: Iterable[Tuple[NGram, SerializableLexicon]] = ()):
+        """:param items: Pairs of contexts and the serializable representations of the
+        Lexicons that follow them
+        """
+        self.order = 0  # The length of the longest contexts
+        # Node 0 is the root, which stands for the empty context.
+        self._parents = array("I", [0])
+        self._units = array("I", [0])
+        counts = [0]
+        self._contexts = array("I")
+        self._rehash(8)
+        # Shorter contexts are added first, so that the node of each context is created
+        # for it, and its entries can be added right after it.
+        for ngram, (entries, n_obs) in sorted(items, key=lambda item: len(item[0])):
+            self._add(ngram, entries, n_obs, counts)
+        self._freeze(counts)
+
+    def _add(
+        self,
+        ngram: NGram,
+        entries: Dict[Unit, int],
+        n_obs: int,
+        counts: MutableSequence[int],
+    ) -> None:
+        if not ngram:
+            raise ValueError("Contexts must not be empty.")
+        node = 0
+        for unit in reversed(ngram[1:]):
+            node = self._child(node, 2 * _VOCABULARY.intern(unit))
+            if node == -1:
+                raise ValueError(
+                    "The suffixes of the context {} are not all contexts.".format(ngram)
+                )
+        key = 2 * _VOCABULARY.intern(ngram[0])
+        if self._child(node, key) != -1:
+            raise ValueError("The context {} is repeated.".format(ngram))
+        node = self._insert(node, key, counts)
+        counts[node] = n_obs
+        self._contexts.append(node)
+        self.order = max(self.order, len(ngram))
+        for unit, count in entries.items():
+            child = self._insert(
+                node, self._entry_key(_VOCABULARY.intern(unit)), counts
+            )
+            counts[child] = count
+
+    def _context(self, ngram: NGram) -> int:
+        # Every node whose key is even is a context.
+        return self._node(ngram) if ngram else -1
+
+    def _entry_key(self, unit_id: int) -> int:
+        return 2 * unit_id + 1
+
+    def _is_entry(self, key: int) -> bool:
+        # The other children of a context are the longer contexts that end with it.
+        return bool(key & 1)
+
+    def _node(self, ngram: Sequence[Unit]) -> int:
+        """Returns the node of the context `ngram`, or -1 if there is none."""
+        node = 0
+        for unit in reversed(ngram):
+            unit_id = _VOCABULARY.ids.get(unit)
+            if unit_id is None:
+                return -1
+            node = self._child(node, 2 * unit_id)
+            if node == -1:
+                return -1
+        return node
+
+    def __getitem__(self, ngram: NGram) -> Lexicon:
+        if not isinstance(ngram, tuple) or not 0 < len(ngram) <= self.order:
+            raise KeyError(ngram)
+        node = self._node(ngram)
+        if node == -1:
+            raise KeyError(ngram)
+        return _BackoffEntries(self, node)
+
+    def __iter__(self) -> Iterator[NGram]:
+        units = _VOCABULARY.units
+        for node in self._contexts:
+            ngram = []
+            while node:
+                ngram.append(units[self._units[node] >> 1])
+                node = self._parents[node]
+            yield tuple(ngram)
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def _backoff(self, ids: Sequence[int], i: int) -> Optional[Probability]:
+        """Returns the probability of the unit with ID `ids[i]` given the longest
+        context that ends at `ids[i - 1]` and after which it was observed, or None if
+        there is none. Unknown units have the ID -1.
+        """
+        if ids[i] == -1:
+            return None
+        child, counts = self._child, self._counts
+        ret = None
+        # The contexts that end at `ids[i - 1]` lie on one path, from the shortest to
+        # the longest.
+        node, entry_key = 0, 2 * ids[i] + 1
+        for j in range(i - 1, max(i - self.order, 0) - 1, -1):
+            if ids[j] == -1:
+                break
+            node = child(node, 2 * ids[j])
+            if node == -1:
+                break
+            entry = child(node, entry_key)
+            if entry != -1:
+                ret = counts[entry] / counts[node]
+        return ret
+
+    def get_conditional(
+        self, context: Sequence[Unit], unit: Unit, default: Optional[Probability] = None
+    ) -> Optional[Probability]:
+        """Returns the probability of `unit` given the longest suffix of `context`
+        after which it was observed, or `default` if there is none.
+        """
+        get_id = _VOCABULARY.ids.get
+        ids = [get_id(u, -1) for u in context[max(len(context) - self.order, 0) :]]
+        ids.append(get_id(unit, -1))
+        p = self._backoff(ids, len(ids) - 1)
+        return default if p is None else p
+
+    def log_get_conditional(
+        self,
+        context: Sequence[Unit],
+        unit: Unit,
+        default: Optional[LogProbability] = None,
+    ) -> Optional[LogProbability]:
+        """Returns the log-probability of `unit` given `context`, or `default`."""
+        p = self.get_conditional(context, unit)
+        if p is None:
+            return default
+        return log(p) if p > 0 else float("-inf")
+
+    def conditionals(self, sequence: Sequence[Unit]) -> List[Optional[Probability]]:
+        """Returns the probability of each unit of `sequence` given the longest context
+        that precedes it and after which it was observed, or None where there is none,
+        as `mpf.backoff` does. This takes O(`self.order`) time per unit.
+        """
+        get_id = _VOCABULARY.ids.get
+        ids = [get_id(unit, -1) for unit in sequence]
+        return [self._backoff(ids, i) for i in range(len(ids))]
+
+    def log_conditionals(
+        self, sequence: Sequence[Unit]
+    ) -> List[Optional[LogProbability]]:
+        """Returns the logarithms of `self.conditionals(sequence)`."""
+        return [
+            None if p is None else log(p) if p > 0 else float("-inf")
+            for p in self.conditionals(sequence)
+        ]
+
+    def to_serializable(self) -> List[Any]:
+        """Returns a JSON-serializable list of the contexts, each with the units that
+        follow it and its number of observations.
+        """
+        return [[list(ngram), *self[ngram].to_serializable()] for ngram in self]
+
+    @classmethod
+    def from_serializable(cls, serializable: List[Any]) -> "BackoffContextLexicon":
+        return cls(
+            (tuple(ngram), (entries, n_obs)) for ngram, entries, n_obs in serializable
+        )
 
-def context_lexicon2serializable(cl: ContextLexicon) -> SerializableContextLexicon:
-    """Converts a ContextLexicon to a Trie."""
+
+def context_lexicon2serializable(
+    cl: ContextLexicon,
+) -> Union[SerializableContextLexicon, List[Any]]:
+    """Converts a ContextLexicon to a Trie, or a BackoffContextLexicon, whose contexts
+    vary in length, to a list (see `BackoffContextLexicon.to_serializable`).
+    """
+    if isinstance(cl, BackoffContextLexicon):
+        return cl.to_serializable()
     ret: SerializableContextLexicon = {}
     for key in cl:
         current = ret
@@ -81,8 +856,14 @@ def context_lexicon2serializable(cl: ContextLexicon) -> SerializableContextLexic
     return ret
 
 
-def serializable2context_lexicon(trie: SerializableContextLexicon) -> ContextLexicon:
-    """Converts a Trie like the output of context_lexicon2trie to a ContextLexicon."""
+def serializable2context_lexicon(
+    trie: Union[SerializableContextLexicon, List[Any]],
+) -> ContextLexicon:
+    """Converts a Trie like the output of context_lexicon2trie to a ContextLexicon, or
+    a list to a BackoffContextLexicon.
+    """
+    if isinstance(trie, list):
+        return BackoffContextLexicon.from_serializable(trie)
 
     def walk(
         trie: Union[SerializableContextLexicon, SerializableLexicon], parents: NGram
@@ -93,17 +874,17 @@ def serializable2context_lexicon(trie: SerializableContextLexicon) -> ContextLex
             for key in trie:
                 yield from walk(trie[key], (*parents, key))
 
-    ret: ContextLexicon = {}
-    for ngram, serializable_lexicon in walk(trie, ()):
-        ret[ngram] = LexiconImpl.from_serializable(serializable_lexicon)
-    return ret
+    return FlatContextLexicon(walk(trie, ()))
 
 
 Counts = Dict[Unit, int]
 
 
 class LexiconBuilder:
-    """Accumulates data about a Lexicon."""
+    """Accumulates data about a Lexicon. Builders that have accumulated data from
+    different texts can be merged, so that a corpus can be divided among several
+    builders (for example, in different processes) without changing the result.
+    """
 
     def __init__(self, splitter: Splitter):
         """Initializes the builder to count linguistic units of the type output by
@@ -117,15 +898,94 @@ class LexiconBuilder:
 
     def add(self, text: Text):
         """Acquires information from `text`."""
-        for unit in self.splitter(text):
-            self._counts[unit] = self._counts.get(unit, 0) + 1
-            self.total += 1
+        self._count(self.splitter(text))
+
+    def _count(self, sequence: Sequence[Unit]):
+        counts = self._counts
+        for unit in sequence:
+            counts[unit] = counts.get(unit, 0) + 1
+        self.total += len(sequence)
+
+    def merge(self, other: "LexiconBuilder") -> "LexiconBuilder":
+        """Acquires the information accumulated by `other`, as if every text added to
+        `other` had been added to `self` after the texts already added to `self`.
+        :return: `self`
+        """
+        _merge_counts(self._counts, other._counts)
+        self.total += other.total
+        return self
+
+    def __add__(self, other: "LexiconBuilder") -> "LexiconBuilder":
+        ret = deepcopy(self)
+        ret.splitter = self.splitter  # It is not copied (see `__getstate__`).
+        return ret.merge(other)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Splitters are often lambdas, which cannot be pickled. A builder that has been
+        # unpickled can still be merged into another builder.
+        state = self.__dict__.copy()
+        state["splitter"] = None
+        return state
+
+    def to_serializable(self) -> Any:
+        """Returns a JSON-serializable representation of the counts accumulated by
+        `self`.
+        """
+        return (self._counts, self.total)
+
+    @classmethod
+    def from_serializable(cls, serializable: Any, splitter: Splitter) -> Any:
+        """Returns a builder that has accumulated the counts in `serializable`.
+        :param splitter: the Splitter instance that was used to obtain the counts
+        """
+        counts, total = serializable
+        ret = cls(splitter)
+        ret._counts, ret.total = dict(counts), total
+        return ret
 
     def get_lexicon(self) -> Lexicon:
         """Returns the Lexicon accumulated by `self`."""
         return LexiconImpl.from_serializable((self._counts, self.total))
 
 
+def _merge_counts(counts: Counts, other: Counts):
+    for unit, count in other.items():
+        counts[unit] = counts.get(unit, 0) + count
+
+
+def _merged(a: SerializableLexicon, b: SerializableLexicon) -> SerializableLexicon:
+    counts = dict(a[0])
+    _merge_counts(counts, b[0])
+    return counts, a[1] + b[1]
+
+
+def merge_lexicons(lexicon: Lexicon, other: Lexicon) -> LexiconImpl:
+    """Returns a Lexicon whose counts and number of observations are the sums of those
+    of `lexicon` and `other`.
+    """
+    return LexiconImpl.from_serializable(
+        _merged(lexicon.to_serializable(), other.to_serializable())
+    )
+
+
+def merge_context_lexicons(
+    cl: ContextLexicon, other: ContextLexicon
+) -> Union[FlatContextLexicon, BackoffContextLexicon]:
+    """Returns a ContextLexicon whose contexts are those of `cl` and `other`, and in
+    which each context is followed by the merge (see `merge_lexicons`) of the Lexicons
+    that follow it in `cl` and `other`.
+    """
+    if isinstance(cl, (FlatContextLexicon, BackoffContextLexicon)):
+        return cl._merged(other)
+    merged = {ngram: cl[ngram].to_serializable() for ngram in cl}
+    for ngram in other:
+        serializable = other[ngram].to_serializable()
+        merged[ngram] = (
+            _merged(merged[ngram], serializable) if ngram in merged else serializable
+        )
+    return FlatContextLexicon(merged.items())
+
+
 class LexiconContextLexiconBuilder(LexiconBuilder):
     """Accumulates data about a Lexicon and ContextLexicon."""
 
@@ -137,19 +997,82 @@ class LexiconContextLexiconBuilder(LexiconBuilder):
         :param n: the number of preceding linguistic units used as context
         """
         self.n = n
-        self._builders: Dict[NGram, LexiconBuilder] = {}
+        # The units that follow each context, with their counts.
+        self._context_counts: Dict[NGram, Counts] = {}
         super().__init__(splitter)
 
     def add(self, text: Text):
         sequence = self.splitter(text)
+        context_counts = self._context_counts
         for n_plus_one_gram in zip(*[sequence[start:] for start in range(self.n + 1)]):
             ngram = n_plus_one_gram[: self.n]
-            self._builders[ngram] = self._builders.get(
-                ngram, LexiconBuilder(self.splitter)
+            counts = context_counts.get(ngram)
+            if counts is None:
+                counts = context_counts[ngram] = {}
+            unit = n_plus_one_gram[-1]
+            counts[unit] = counts.get(unit, 0) + 1
+        self._count(sequence)
+
+    def merge(self, other: LexiconBuilder) -> LexiconBuilder:
+        if type(other) is not type(self) or other.n != self.n:
+            raise ValueError(
+                "Only builders of the same type with contexts of equal length can "
+                "merge."
             )
-            self._builders[ngram].add(n_plus_one_gram[-1])
-        super().add(text)
+        for ngram, counts in other._context_counts.items():
+            if ngram in self._context_counts:
+                _merge_counts(self._context_counts[ngram], counts)
+            else:
+                self._context_counts[ngram] = dict(counts)
+        return super().merge(other)
+
+    def to_serializable(self) -> Any:
+        # JSON objects cannot be keyed by n-grams, so contexts are listed.
+        return (
+            self._counts,
+            self.total,
+            self.n,
+            [[list(ngram), counts] for ngram, counts in self._context_counts.items()],
+        )
+
+    @classmethod
+    def from_serializable(cls, serializable: Any, splitter: Splitter) -> Any:
+        counts, total, n, context_counts = serializable
+        ret = cls(splitter, n)
+        ret._counts, ret.total = dict(counts), total
+        ret._context_counts = {
+            tuple(ngram): dict(counts) for ngram, counts in context_counts
+        }
+        return ret
 
     def get_context_lexicon(self) -> ContextLexicon:
         """Returns the ContextLexicon accumulated by `self`."""
-        return {key: self._builders[key].get_lexicon() for key in self._builders}
+        return {
+            key: LexiconImpl.from_serializable((counts, sum(counts.values())))
+            for key, counts in self._context_counts.items()
+        }
+
+
+class BackoffContextLexiconBuilder(LexiconContextLexiconBuilder):
+    """Accumulates data about a Lexicon and a BackoffContextLexicon, whose contexts are
+    all the sequences of up to `n` units that precede a unit.
+    """
+
+    def add(self, text: Text):
+        sequence = self.splitter(text)
+        context_counts = self._context_counts
+        for i in range(1, len(sequence)):
+            unit = sequence[i]
+            for start in range(i - 1, max(i - self.n, 0) - 1, -1):
+                ngram = tuple(sequence[start:i])
+                counts = context_counts.get(ngram)
+                if counts is None:
+                    counts = context_counts[ngram] = {}
+                counts[unit] = counts.get(unit, 0) + 1
+        self._count(sequence)
+
+    def get_context_lexicon(self) -> ContextLexicon:
+        return BackoffContextLexicon(
+            (ngram, (counts, sum(counts.values())))
+            for ngram, counts in self._context_counts.items()
+        )
@@ -1,14 +1,71 @@
 """This module provides MarkovPFactory implementations."""
-from typing import cast, List, Optional
 
-from textprobability.core.types import MarkovPFactory
+from typing import Callable, cast, List, Optional
 
-default: MarkovPFactory = lambda cl: (
+from textprobability.core.common import annotated
+from textprobability.core.lexicon import BackoffContextLexicon, FlatContextLexicon
+from textprobability.core.types import (
+    LogMarkovPFactory,
+    LogSequentialConditionalP,
+    MarkovPFactory,
+    SequentialConditionalP,
+)
+from textprobability.data.mapped import MappedContextLexicon
+
+# These compute the probabilities of a whole sequence themselves.
+_SEQUENTIAL = (FlatContextLexicon, BackoffContextLexicon, MappedContextLexicon)
+
+_mapping_default: MarkovPFactory = lambda cl: (
     lambda key_len: lambda sequence: cast(List[Optional[float]], [None] * key_len)
     + [
         cl[context].get(unit, None) if context in cl else None
         for context, unit in zip(
-            zip(*[sequence[start:] for start in range(key_len)]), sequence[key_len:]
+            zip(*[sequence[start:] for start in range(key_len)]),
+            sequence[key_len:],
         )
     ]
 )(len(next(iter(cl.keys()))))
+
+_log_mapping_default: LogMarkovPFactory = lambda cl: (
+    lambda key_len: lambda sequence: cast(List[Optional[float]], [None] * key_len)
+    + [
+        cl[context].log_get(unit, None) if context in cl else None
+        for context, unit in zip(
+            zip(*[sequence[start:] for start in range(key_len)]),
+            sequence[key_len:],
+        )
+    ]
+)(len(next(iter(cl.keys()))))
+
+# The probability of a unit given the longest context that precedes it and after which
+# it was observed, so that the model backs off from longer contexts to shorter ones.
+backoff: Callable[[BackoffContextLexicon], SequentialConditionalP] = (
+    lambda cl: annotated(lambda sequence: cl.conditionals(sequence), "mpf", cl)
+)
+
+log_backoff: Callable[[BackoffContextLexicon], LogSequentialConditionalP] = (
+    lambda cl: annotated(lambda sequence: cl.log_conditionals(sequence), "log_mpf", cl)
+)
+
+# A FlatContextLexicon (or MappedContextLexicon) computes the probabilities of a whole
+# sequence itself, without building a tuple for each context. A BackoffContextLexicon
+# always backs off.
+default: MarkovPFactory = lambda cl: annotated(
+    (
+        (lambda sequence: cl.conditionals(sequence))
+        if isinstance(cl, _SEQUENTIAL)
+        else _mapping_default(cl)
+    ),
+    "mpf",
+    cl,
+)
+
+log_default: LogMarkovPFactory = lambda cl: annotated(
+    (
+        (lambda sequence: cl.log_conditionals(sequence))
+        if isinstance(cl, _SEQUENTIAL)
+        else _log_mapping_default(cl)
+    ),
+    "log_mpf",
+    cl,
+)
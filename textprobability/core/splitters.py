@@ -1,10 +1,48 @@
 """This module implements common schemes for splitting strings into linguistic units."""
 
-from textprobability.core.types import Splitter
+from textprobability.core.types import Splitter, Unit
 import re
+from typing import Iterable, Iterator, List, Tuple
 
+# A latin token is a maximal run of word characters (or replacement characters, which
+# stand in for undecodable bytes), or any other single character that is not whitespace.
+_LATIN_TOKEN = re.compile(r"[\w�]+|[^\w\s�]")
+_WORD_CHAR = re.compile(r"[\w�]")
 
-latin_tokens: Splitter = lambda s: [
-    w for w in re.split(r"(?<=[^\w�])|(?=[^\w�])", s) if w.strip()
-]
+latin_tokens: Splitter = _LATIN_TOKEN.findall
 characters: Splitter = lambda s: s  # A string is an iterable of strings.
+
+
+def latin_token_spans(s: str) -> List[Tuple[int, int]]:
+    """Returns the start and end offsets in `s` of each of its latin tokens."""
+    return [match.span() for match in _LATIN_TOKEN.finditer(s)]
+
+
+def iter_latin_token_spans(chunks: Iterable[str]) -> Iterator[Tuple[Unit, int, int]]:
+    """Iterates over the latin tokens of the concatenation of `chunks`, with their start
+    and end offsets in it, without holding more than one chunk (and one token) in memory
+    at a time.
+    """
+    partial = ""
+    offset = 0  # The offset of the end of the chunks read so far
+    for chunk in chunks:
+        text = partial + chunk
+        base = offset - len(partial)
+        offset += len(chunk)
+        partial = ""
+        for match in _LATIN_TOKEN.finditer(text):
+            token = match.group()
+            # A run of word characters that ends a chunk might continue in the next.
+            if match.end() == len(text) and _WORD_CHAR.match(token):
+                partial = token
+            else:
+                yield token, base + match.start(), base + match.end()
+    if partial:
+        yield partial, offset - len(partial), offset
+
+
+def iter_latin_tokens(chunks: Iterable[str]) -> Iterator[Unit]:
+    """Iterates over the latin tokens of the concatenation of `chunks`. See
+    `iter_latin_token_spans`.
+    """
+    return (token for token, _, _ in iter_latin_token_spans(chunks))
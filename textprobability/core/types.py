@@ -3,7 +3,26 @@ important abstractions as well. Abbreviations such as "scp", "mpf", and "clf" ma
 to types defined here.
 """
 
-from typing import Callable, Dict, Iterable, Sequence, Optional, Tuple, Any
+from math import log
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Mapping,
+    Sequence,
+    Optional,
+    Tuple,
+    Any,
+)
+
+try:
+    from typing import Protocol
+except ImportError:  # Python < 3.8
+    from typing_extensions import Protocol  # type: ignore
+
+if TYPE_CHECKING:
+    from textprobability.core.cache import LRUCache
 
 # -------------------------------------------------------------------------------------#
 # The following are elemental types.                                                   |
@@ -12,6 +31,10 @@ from typing import Callable, Dict, Iterable, Sequence, Optional, Tuple, Any
 Probability = float  # (In the interval [0, 1], of course.)
 # A given probability function may be undefined for certain inputs.
 P = Callable[[str], Optional[Probability]]
+# The natural logarithm of a Probability. Products of many probabilities underflow, but
+# sums of their logarithms do not.
+LogProbability = float
+LogP = Callable[[str], Optional[LogProbability]]
 Unit = str  # This is an abbreviation for "linguistic unit."
 Char = Unit
 Token = Unit
@@ -27,6 +50,8 @@ Corpus = Iterable[Text]
 
 
 class Serializable:
+    __slots__ = ()
+
     def to_serializable(self) -> Any:
         raise NotImplementedError()
 
@@ -37,6 +62,8 @@ class Serializable:
 
 # See lexicon.py for implementation.
 class Lexicon(Serializable):
+    __slots__ = ("n_obs",)
+
     def __init__(self, n_obs: int):
         self.n_obs = n_obs
 
@@ -48,27 +75,65 @@ class Lexicon(Serializable):
     ) -> Optional[Probability]:
         raise NotImplementedError()
 
+    def log_get(
+        self, key: Unit, default: Optional[LogProbability] = None
+    ) -> Optional[LogProbability]:
+        """Returns the log-probability associated with `key`, or `default`."""
+        p = self.get(key)
+        if p is None:
+            return default
+        return log(p) if p > 0 else float("-inf")
 
-ContextLexicon = Dict[NGram, Lexicon]
+
+ContextLexicon = Mapping[NGram, Lexicon]
 # See splitters.py for implementation.
 # Splitters are idempotent.
 Splitter = Callable[[str], Sequence[Unit]]
 SequentialConditionalP = Callable[[Sequence[Unit]], Sequence[Optional[Probability]]]
+LogSequentialConditionalP = Callable[
+    [Sequence[Unit]], Sequence[Optional[LogProbability]]
+]
 # See common.py for implementation.
 Collapser = Callable[[SequentialConditionalP, Splitter], P]
+LogCollapser = Callable[[LogSequentialConditionalP, Splitter], LogP]
 # See common.py for implementation.
 StatelessPFactory = Callable[[Lexicon], SequentialConditionalP]
+LogStatelessPFactory = Callable[[Lexicon], LogSequentialConditionalP]
 # See mpf for implementation(s).
 MarkovPFactory = Callable[[ContextLexicon], SequentialConditionalP]
+LogMarkovPFactory = Callable[[ContextLexicon], LogSequentialConditionalP]
+
+
 # See common.py for implementation.
 # With a probability given by SCP3, any given Unit may be assigned undefined probability
 # by SCP1, in which case that Unit is split using a Splitter into smaller Units that can
 # be used as input to SCP2. SCP2 can then assign probability to that Unit.
 # Note: Arbitrarily extended compounding is possible because any SCP may itself be
 # a CompoundP.
-CompoundPFactory = Callable[
-    [SequentialConditionalP, SequentialConditionalP, SequentialConditionalP, Splitter],
-    SequentialConditionalP,
-]
+# A CompoundPFactory may also be given a cache (see cache.py) in which to memoize the
+# probabilities assigned by SCP2.
+class CompoundPFactory(Protocol):
+    def __call__(
+        self,
+        scp1: SequentialConditionalP,
+        scp2: SequentialConditionalP,
+        scp3: SequentialConditionalP,
+        splitter: Splitter,
+        cache: Optional["LRUCache"] = None,
+    ) -> SequentialConditionalP: ...
+
+
+# The same as a CompoundPFactory, except that all SCPs are LogSCPs.
+class LogCompoundPFactory(Protocol):
+    def __call__(
+        self,
+        scp1: LogSequentialConditionalP,
+        scp2: LogSequentialConditionalP,
+        scp3: LogSequentialConditionalP,
+        splitter: Splitter,
+        cache: Optional["LRUCache"] = None,
+    ) -> LogSequentialConditionalP: ...
+
+
 # See common.py for implementation(s).
 LexiconFactory = Callable[[Corpus, Splitter], Tuple[Lexicon, ContextLexicon]]
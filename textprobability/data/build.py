@@ -0,0 +1,133 @@
+"""Builds language data from a corpus, optionally in parallel.
+
+The corpus is divided into consecutive shards of texts, each of which is counted by its
+own builders in a worker process. The builders are then merged in the order of their
+shards, so the result is identical to that of a serial build.
+"""
+
+from collections import deque
+from itertools import islice
+import multiprocessing
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from textprobability.core.lexicon import (
+    BackoffContextLexiconBuilder,
+    LexiconContextLexiconBuilder,
+)
+from textprobability.core.splitters import latin_tokens, characters
+from textprobability.core.types import Corpus, Text
+from textprobability.data.langdata import DefaultLangData
+
+Builders = Tuple[LexiconContextLexiconBuilder, LexiconContextLexiconBuilder]
+
+
+def builders(token_n: int = 1, char_n: int = 2, backoff: bool = False) -> Builders:
+    """Returns empty token and char builders with the given context lengths.
+    :param backoff: Whether to count the contexts of every length up to the given
+        lengths, for Markov models that back off from longer contexts to shorter ones
+        (see `BackoffContextLexicon`)
+    """
+    builder = BackoffContextLexiconBuilder if backoff else LexiconContextLexiconBuilder
+    return builder(latin_tokens, token_n), builder(characters, char_n)
+
+
+def to_lang_data(token_builder, char_builder) -> DefaultLangData:
+    """Returns the language data accumulated by the given builders."""
+    return DefaultLangData(
+        token_builder.get_lexicon(),
+        token_builder.get_context_lexicon(),
+        char_builder.get_lexicon(),
+        char_builder.get_context_lexicon(),
+    )
+
+
+def _count(shard: Tuple[List[Text], int, int, bool]) -> Builders:
+    texts, token_n, char_n, backoff = shard
+    token_builder, char_builder = builders(token_n, char_n, backoff)
+    for text in texts:
+        token_builder.add(text)
+        char_builder.add(text)
+    return token_builder, char_builder
+
+
+def _shards(corpus: Corpus, shard_size: int) -> Iterator[List[Text]]:
+    texts = iter(corpus)
+    while True:
+        shard = list(islice(texts, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+def build_builders(
+    corpus: Corpus,
+    token_n: int = 1,
+    char_n: int = 2,
+    processes: Optional[int] = None,
+    shard_size: int = 1000,
+    into: Optional[Builders] = None,
+    max_tokens: int = -1,
+    backoff: bool = False,
+) -> Builders:
+    """Counts the units of `corpus` in parallel.
+    :param corpus: The texts to count, which are read lazily
+    :param token_n: The number of preceding tokens to consider as context
+    :param char_n: The number of preceding characters to consider as context
+    :param processes: The number of worker processes (by default, one per core). If
+        this is 1, no worker processes are used.
+    :param shard_size: The number of texts given to a worker at a time
+    :param into: Builders into which to merge the counts, if any
+    :param max_tokens: The approximate maximum number of tokens to count, or -1 for
+        no maximum. Reading stops once this many tokens have been counted.
+    :param backoff: Whether to count contexts of every length (see `builders`)
+    :return: The token and char builders
+    """
+    token_builder, char_builder = (
+        builders(token_n, char_n, backoff) if into is None else into
+    )
+
+    def merge(counted: Builders):
+        token_builder.merge(counted[0])
+        char_builder.merge(counted[1])
+
+    def done() -> bool:
+        return max_tokens != -1 and token_builder.total >= max_tokens
+
+    if processes == 1:
+        for shard in _shards(corpus, shard_size):
+            if done():
+                break
+            merge(_count((shard, token_n, char_n, backoff)))
+        return token_builder, char_builder
+    with multiprocessing.Pool(processes) as pool:
+        # Only a bounded number of shards are in flight, so that the corpus need not fit
+        # in memory. They are merged in order so that the result is deterministic.
+        max_pending = 2 * (processes or multiprocessing.cpu_count())
+        pending: Deque = deque()
+        for shard in _shards(corpus, shard_size):
+            if done():
+                break
+            pending.append(
+                pool.apply_async(_count, ((shard, token_n, char_n, backoff),))
+            )
+            if len(pending) >= max_pending:
+                merge(pending.popleft().get())
+        while pending:
+            merge(pending.popleft().get())
+    return token_builder, char_builder
+
+
+def build(
+    corpus: Corpus,
+    token_n: int = 1,
+    char_n: int = 2,
+    processes: Optional[int] = None,
+    shard_size: int = 1000,
+    backoff: bool = False,
+) -> DefaultLangData:
+    """Returns the language data of `corpus`, counted in parallel. See
+    `build_builders`.
+    """
+    return to_lang_data(
+        *build_builders(corpus, token_n, char_n, processes, shard_size, backoff=backoff)
+    )
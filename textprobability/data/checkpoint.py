@@ -0,0 +1,96 @@
+"""This module saves the progress of a build from a web walk, so that a build that is
+interrupted can be resumed.
+
+A checkpoint file is a sequence of lines, each of which is a JSON object that records
+what was counted and which pages were visited since the previous line, together with the
+current state of the walk. Saving therefore takes time in proportion to the progress
+made since the last save, and not to the total progress.
+"""
+
+import json
+import os
+from typing import Any, Dict, IO, Optional, Tuple
+
+from numpy.random import Generator
+
+from textprobability.core.lexicon import LexiconContextLexiconBuilder
+from textprobability.core.splitters import characters, latin_tokens
+from textprobability.data.build import Builders, builders
+from textprobability.data.filters import BloomFilter
+from textprobability.data.web_walk import WalkState
+
+SUFFIX = ".checkpoint"
+
+
+def save(
+    f: IO[str], deltas: Builders, state: WalkState, rng: Generator, elapsed: float
+) -> None:
+    """Appends a record of progress to `f`, and clears `state.recently_visited`.
+    :param f: A checkpoint file that is open for appending
+    :param deltas: Builders that hold the counts accumulated since the last save
+    :param state: The state of the walk
+    :param rng: The random number generator that drives the walk
+    :param elapsed: The number of seconds that the build has taken so far
+    """
+    record = {
+        "token_builder": deltas[0].to_serializable(),
+        "char_builder": deltas[1].to_serializable(),
+        "visited": state.recently_visited,
+        "fringe": state.fringe,
+        "position": state.position,
+        "new_fringe": state.new_fringe,
+        "rng": rng.bit_generator.state,
+        "elapsed": elapsed,
+    }
+    f.write(json.dumps(record) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+    state.recently_visited = []
+
+
+def load(
+    path: str, token_n: int, char_n: int, visited: Optional[BloomFilter] = None
+) -> Tuple[Builders, WalkState, Dict[str, Any], float]:
+    """Returns the progress saved in the checkpoint file at `path`: the builders, the
+    state of the walk, the state of its random number generator, and the number of
+    seconds taken. If the last record of the file was cut short (for example, by a
+    crash), it is removed from the file.
+    :param visited: An empty filter in which to record the visited pages (see
+        `WalkState`)
+    """
+    token_builder, char_builder = builders(token_n, char_n)
+    state = WalkState("", visited)
+    rng_state: Dict[str, Any] = {}
+    elapsed = 0.0
+    end = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            token_builder.merge(
+                LexiconContextLexiconBuilder.from_serializable(
+                    record["token_builder"], latin_tokens
+                )
+            )
+            char_builder.merge(
+                LexiconContextLexiconBuilder.from_serializable(
+                    record["char_builder"], characters
+                )
+            )
+            state.visited.update(record["visited"])
+            state.fringe = record["fringe"]
+            state.position = record["position"]
+            state.new_fringe = record["new_fringe"]
+            rng_state = record["rng"]
+            elapsed = record["elapsed"]
+            end += len(line)
+    if end < os.path.getsize(path):
+        print("Discarding an incomplete record at the end of {}.".format(path))
+        os.truncate(path, end)
+    if not rng_state:
+        raise ValueError("{} contains no checkpoints.".format(path))
+    return (token_builder, char_builder), state, rng_state, elapsed
@@ -0,0 +1,167 @@
+"""Filters that keep long web walks from spending memory and counts on pages that they
+have already seen.
+
+A `BloomFilter` records visited URLs in a fixed number of bits, however long the walk.
+A `NearDuplicateFilter` recognizes texts that are nearly the same as texts seen before
+(such as pages generated from one template) by their SimHash fingerprints, so that they
+are not counted again.
+"""
+
+from collections import deque
+import hashlib
+from math import ceil, log
+from typing import Deque, Dict, Iterable, List, Sequence
+import warnings
+
+import numpy as np
+
+from textprobability.core.splitters import latin_tokens
+
+
+def _hash(item: str, digest_size: int) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(item.encode("utf-8"), digest_size=digest_size).digest(),
+        "little",
+    )
+
+
+class BloomFilter:
+    """A set of strings that takes a fixed amount of memory. It may report that it
+    contains a string that was never added (a false positive), but never the opposite.
+    A warning is issued when more than `capacity` strings have been added, as false
+    positives then grow more common than `error_rate`.
+    """
+
+    def __init__(self, capacity: int = 10**6, error_rate: float = 1e-3):
+        """:param capacity: The number of strings that can be added before the rate of
+            false positives exceeds `error_rate`
+        :param error_rate: The greatest rate of false positives while no more than
+            `capacity` strings have been added
+        """
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError(
+                "The capacity must be positive, and the error rate must be between 0 "
+                "and 1."
+            )
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # These are the numbers of bits and of hash functions that minimize the size of
+        # the filter at the given capacity and error rate.
+        self.n_bits = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * log(2)))
+        self._bits = bytearray((self.n_bits + 7) // 8)
+        self.n_added = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Each position is derived from two independent hashes (Kirsch and
+        # Mitzenmacher).
+        h = _hash(item, 16)
+        h1, h2 = h & 0xFFFFFFFFFFFFFFFF, h >> 64 | 1
+        return ((h1 + i * h2) % self.n_bits for i in range(self.n_hashes))
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.n_added += 1
+        if self.n_added == self.capacity + 1:
+            warnings.warn(
+                "More than {} strings have been added to a Bloom filter with a capacity "
+                "of {}, so its rate of false positives may exceed {}.".format(
+                    self.capacity, self.capacity, self.error_rate
+                ),
+                RuntimeWarning,
+                stacklevel=2,
+            )
+
+    def update(self, items: Iterable[str]) -> None:
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, str):
+            return False
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+def _simhash(tokens: Sequence[str], shingle_size: int) -> int:
+    shingles = {
+        " ".join(tokens[i : i + shingle_size]).lower()
+        for i in range(max(len(tokens) - shingle_size + 1, 1))
+    }
+    hashes = np.fromiter(
+        (_hash(shingle, 8) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # Each bit of the fingerprint is the majority of that bit among the shingles.
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    majority = 2 * bits.sum(axis=0) > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """Returns the 64-bit SimHash fingerprint of the shingles (runs of `shingle_size`
+    consecutive tokens, ignoring case) of `text`. Texts that share most of their
+    shingles have fingerprints that differ in few bits.
+    """
+    return _simhash(latin_tokens(text), shingle_size)
+
+
+class NearDuplicateFilter:
+    """Recognizes texts whose SimHash fingerprints differ in at most `max_distance` bits
+    from that of a text seen before. Only the fingerprints of the last `capacity` texts
+    are kept.
+
+    Fingerprints are divided into `max_distance + 1` blocks of bits. Two fingerprints
+    that differ in at most `max_distance` bits agree in at least one block, so only the
+    fingerprints that agree with a new one in some block are compared with it.
+    """
+
+    def __init__(
+        self, max_distance: int = 3, capacity: int = 10**6, shingle_size: int = 3
+    ):
+        if not 0 <= max_distance < 16:
+            raise ValueError("The maximum distance must be between 0 and 15.")
+        self.max_distance = max_distance
+        self.capacity = capacity
+        self.shingle_size = shingle_size
+        n_blocks = max_distance + 1
+        self._bounds = [64 * i // n_blocks for i in range(n_blocks + 1)]
+        # The fingerprints that have each value of each block, keyed by the index of
+        # the block and the value, as in `_keys`
+        self._blocks: Dict[int, List[int]] = {}
+        self._fingerprints: Deque[int] = deque()
+
+    def _keys(self, fingerprint: int) -> Iterable[int]:
+        for i, (start, end) in enumerate(zip(self._bounds, self._bounds[1:])):
+            yield i << 64 | (fingerprint >> start) & ((1 << (end - start)) - 1)
+
+    def is_duplicate(self, text: str) -> bool:
+        """Returns whether `text` is nearly the same as a text seen before, and if not,
+        remembers it. Texts without tokens are never duplicates.
+        """
+        tokens = latin_tokens(text)
+        if not tokens:
+            return False
+        fingerprint = _simhash(tokens, self.shingle_size)
+        keys = list(self._keys(fingerprint))
+        for key in keys:
+            for other in self._blocks.get(key, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return True
+        for key in keys:
+            self._blocks.setdefault(key, []).append(fingerprint)
+        self._fingerprints.append(fingerprint)
+        if len(self._fingerprints) > self.capacity:
+            oldest = self._fingerprints.popleft()
+            for key in self._keys(oldest):
+                fingerprints = self._blocks[key]
+                fingerprints.remove(oldest)
+                if not fingerprints:
+                    del self._blocks[key]
+        return False
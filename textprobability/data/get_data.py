@@ -1,23 +1,25 @@
 import json
 import argparse
+import os
 import sys
 import time
+from typing import Optional
 from numpy.random import default_rng
-from textprobability.core.splitters import latin_tokens, characters
-from textprobability.core.lexicon import (
-    context_lexicon2serializable,
-    LexiconContextLexiconBuilder,
-)
-from textprobability.data.langdata import DefaultLangData
+from textprobability.data import checkpoint
+from textprobability.data.build import builders, to_lang_data
+from textprobability.data.filters import BloomFilter, NearDuplicateFilter
 from textprobability.data.web_walk import (
+    concurrent_web_walk,
     web_walk,
+    WalkState,
     wikipedia,
     wikipedia_about_page,
     get_query_string_remover,
     get_prefixer,
 )
 
-_SECONDS_PER_HOUR = 60 * 60
+_SECONDS_PER_MINUTE = 60
+_SECONDS_PER_HOUR = 60 * _SECONDS_PER_MINUTE
 
 
 def main(
@@ -28,38 +30,100 @@ def main(
     seed: int,
     token_n: int,
     char_n: int,
+    concurrency: int = 1,
+    timeout: float = 30,
+    min_interval: float = 0,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: float = 10,
+    resume: bool = False,
+    visited_capacity: int = 10**6,
+    visited_error_rate: float = 1e-3,
+    max_distance: int = 3,
 ) -> int:
-    token_builder = LexiconContextLexiconBuilder(latin_tokens, token_n)
-    char_builder = LexiconContextLexiconBuilder(characters, char_n)
-    t0 = time.time()
+    checkpoint_path = checkpoint_path or out + checkpoint.SUFFIX
+    rng = default_rng(seed)
+    visited = BloomFilter(visited_capacity, visited_error_rate)
+    # Near-duplicates are recognized only among the pages fetched by this run.
+    near_duplicates = None if max_distance < 0 else NearDuplicateFilter(max_distance)
+    if resume:
+        (token_builder, char_builder), state, rng_state, elapsed = checkpoint.load(
+            checkpoint_path, token_n, char_n, visited
+        )
+        rng.bit_generator.state = rng_state
+    elif os.path.exists(checkpoint_path):
+        print(
+            "{} exists. Pass --resume to continue from it, or remove it to start "
+            "over.".format(checkpoint_path)
+        )
+        return 1
+    else:
+        token_builder, char_builder = builders(token_n, char_n)
+        state = WalkState(wikipedia_about_page(langcode), visited)
+        elapsed = 0
+    t0 = time.time() - elapsed
+    # Texts are counted by `deltas`, which are merged into the other builders whenever
+    # a checkpoint is saved, so that each checkpoint holds only the new counts.
+    deltas = builders(token_n, char_n)
+    last_save = time.time()
+
+    def save():
+        nonlocal deltas, last_save
+        checkpoint.save(checkpoint_file, deltas, state, rng, time.time() - t0)
+        token_builder.merge(deltas[0])
+        char_builder.merge(deltas[1])
+        deltas = builders(token_n, char_n)
+        last_save = time.time()
 
     def finish():
+        save()
         with open(out, "w") as f:
-            json.dump(
-                DefaultLangData(
-                    token_builder.get_lexicon(),
-                    token_builder.get_context_lexicon(),
-                    char_builder.get_lexicon(),
-                    char_builder.get_context_lexicon(),
-                ).to_serializable(),
-                f,
-            )
+            json.dump(to_lang_data(token_builder, char_builder).to_serializable(), f)
 
-    for text in web_walk(
-        wikipedia_about_page(langcode),
-        default_rng(seed),
-        {wikipedia(langcode)},
-        url_resolver=get_query_string_remover(get_prefixer(wikipedia(langcode))),
-        verbose=True,
-    ):
-        if token_builder.total >= max_text and max_text != -1:
-            finish()
-            return 0
-        if time.time() - t0 > max_time * _SECONDS_PER_HOUR:
+    walk_args = (wikipedia_about_page(langcode), rng, {wikipedia(langcode)})
+    url_resolver = get_query_string_remover(get_prefixer(wikipedia(langcode)))
+    if concurrency > 1:
+        texts = concurrent_web_walk(
+            *walk_args,
+            url_resolver=url_resolver,
+            verbose=True,
+            max_in_flight=concurrency,
+            timeout=timeout,
+            min_interval=min_interval,
+            state=state,
+        )
+    else:
+        texts = web_walk(
+            *walk_args,
+            url_resolver=url_resolver,
+            verbose=True,
+            state=state,
+            timeout=timeout,
+            min_interval=min_interval,
+        )
+    with open(checkpoint_path, "a") as checkpoint_file:
+        try:
+            for text in texts:
+                # Near-duplicates are skipped, so that boilerplate does not skew the
+                # counts.
+                if near_duplicates is None or not near_duplicates.is_duplicate(text):
+                    deltas[0].add(text)
+                    deltas[1].add(text)
+                # Limits are checked after a text is counted, so that no text is
+                # consumed from the walk without being counted.
+                if token_builder.total + deltas[0].total >= max_text and max_text != -1:
+                    finish()
+                    return 0
+                if time.time() - t0 > max_time * _SECONDS_PER_HOUR:
+                    finish()
+                    return 0
+                if time.time() - last_save > checkpoint_interval * _SECONDS_PER_MINUTE:
+                    save()
+            # The walk has run out of pages to visit.
             finish()
-            return 0
-        token_builder.add(text)
-        char_builder.add(text)
+        except KeyboardInterrupt:
+            save()
+            print("Interrupted. Pass --resume to continue.")
+            return 1
     return 0
 
 
@@ -101,6 +165,64 @@ if __name__ == "__main__":
         help="The number of preceding characters to consider as context.",
         type=int,
     )
+    parser.add_argument(
+        "--concurrency",
+        default=1,
+        help="The maximum number of pages to fetch at a time.",
+        type=int,
+    )
+    parser.add_argument(
+        "--timeout",
+        default=30,
+        help="The maximum number of seconds to wait for a server.",
+        type=float,
+    )
+    parser.add_argument(
+        "--min-interval",
+        default=0,
+        help="The minimum number of seconds between requests to the same host.",
+        type=float,
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="The path to the checkpoint file, to which progress is appended "
+        "periodically. By default, this is the path to the output file followed by "
+        "{}.".format(checkpoint.SUFFIX),
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        default=10,
+        help="The approximate time between checkpoints, in minutes.",
+        type=float,
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Whether to continue from the checkpoint file of an earlier run.",
+    )
+    parser.add_argument(
+        "--visited-capacity",
+        default=10**6,
+        help="The number of visited pages that can be recorded in a fixed amount of "
+        "memory before the rate at which unvisited pages are taken for visited ones "
+        "exceeds --visited-error-rate.",
+        type=int,
+    )
+    parser.add_argument(
+        "--visited-error-rate",
+        default=1e-3,
+        help="The greatest rate at which unvisited pages are taken for visited ones.",
+        type=float,
+    )
+    parser.add_argument(
+        "--max-distance",
+        default=3,
+        help="The greatest number of bits in which the SimHash fingerprint of a page "
+        "may differ from that of an earlier page for the page to be skipped as a near "
+        "duplicate, or -1 to count every page.",
+        type=int,
+    )
     args = parser.parse_args()
     sys.exit(
         main(
@@ -111,5 +233,14 @@ if __name__ == "__main__":
             args.seed,
             args.token_n,
             args.char_n,
+            args.concurrency,
+            args.timeout,
+            args.min_interval,
+            args.checkpoint,
+            args.checkpoint_interval,
+            args.resume,
+            args.visited_capacity,
+            args.visited_error_rate,
+            args.max_distance,
         )
     )
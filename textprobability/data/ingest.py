@@ -0,0 +1,220 @@
+"""This script builds language data from local files, such as Wikipedia dumps, without
+touching the network.
+
+Files may be plain text or Wikipedia XML dumps, optionally compressed with gzip or
+bzip2. They are streamed, so memory use does not grow with their size.
+"""
+
+import argparse
+import bz2
+import gzip
+import html
+import io
+import re
+import sys
+from typing import cast, IO, Iterator, List
+import xml.etree.ElementTree as ElementTree
+
+from textprobability.data import mapped
+from textprobability.data.build import build_builders, to_lang_data
+from textprobability.data.merge import write
+
+# Plain text is divided into paragraphs, but no text is allowed to grow beyond this many
+# characters, so that a file without blank lines does not have to fit in memory.
+MAX_TEXT_LEN = 1 << 20
+
+_WIKI_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_WIKI_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+_WIKI_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+_WIKI_TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+_WIKI_TABLE = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+_WIKI_FILE = re.compile(r"\[\[(?:[^\[\]]|\[\[[^\[\]]*\]\])*\]\]")
+_WIKI_LINK = re.compile(r"\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]")
+_WIKI_EXTERNAL_LINK = re.compile(r"\[(?:https?:)?//[^\s\]]*\s*([^\]]*)\]")
+_WIKI_EMPHASIS = re.compile(r"'{2,}")
+_WIKI_HEADING = re.compile(r"^=+\s*(.*?)\s*=+\s*$", re.MULTILINE)
+_WIKI_LIST = re.compile(r"^[*#:;]+\s*", re.MULTILINE)
+
+
+def wikitext_to_text(wikitext: str) -> str:
+    """Returns the readable text of a Wikipedia article, given its markup. This is not a
+    full parser, but it removes templates, tables, references, files, and markup.
+    """
+    text = _WIKI_COMMENT.sub("", wikitext)
+    text = _WIKI_REF.sub("", text)
+    while True:  # Templates nest.
+        text, n = _WIKI_TEMPLATE.subn("", text)
+        if not n:
+            break
+    text = _WIKI_TABLE.sub("", text)
+
+    def link(match):
+        inner = match.group(0)[2:-2]
+        return "" if ":" in inner.split("|")[0] else match.group(0)
+
+    text = _WIKI_FILE.sub(link, text)  # Files and categories have namespaces.
+    text = _WIKI_LINK.sub(r"\1", text)
+    text = _WIKI_EXTERNAL_LINK.sub(r"\1", text)
+    text = _WIKI_TAG.sub("", text)
+    text = _WIKI_EMPHASIS.sub("", text)
+    text = _WIKI_HEADING.sub(r"\1", text)
+    text = _WIKI_LIST.sub("", text)
+    return html.unescape(text)
+
+
+def _open(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return cast(IO[bytes], gzip.open(path))
+    if path.endswith(".bz2"):
+        return cast(IO[bytes], bz2.open(path))
+    return open(path, "rb")
+
+
+def _is_wikipedia_dump(path: str) -> bool:
+    return re.search(r"\.xml(\.gz|\.bz2)?$", path) is not None
+
+
+def plaintext(f: IO[bytes]) -> Iterator[str]:
+    """Iterates over the paragraphs of a UTF-8 text file."""
+    paragraph: List[str] = []
+    length = 0
+    for line in io.TextIOWrapper(f, encoding="utf-8", errors="replace"):
+        if line.strip():
+            paragraph.append(line)
+            length += len(line)
+        if (not line.strip() or length >= MAX_TEXT_LEN) and paragraph:
+            yield "".join(paragraph)
+            paragraph = []
+            length = 0
+    if paragraph:
+        yield "".join(paragraph)
+
+
+def wikipedia_dump(f: IO[bytes]) -> Iterator[str]:
+    """Iterates over the texts of the articles in a Wikipedia XML dump. Redirects and
+    pages outside the main namespace are skipped.
+    """
+    root = None
+    for event, element in ElementTree.iterparse(f, events=("start", "end")):
+        if root is None:
+            root = element
+        if event != "end" or not element.tag.endswith("}page"):
+            continue
+        namespace = element.tag[: -len("page")]
+        is_article = (
+            element.findtext(namespace + "ns") == "0"
+            and element.find(namespace + "redirect") is None
+        )
+        text = element.findtext("{0}revision/{0}text".format(namespace))
+        root.clear()  # This keeps memory use bounded.
+        if is_article and text:
+            yield wikitext_to_text(text)
+
+
+def corpus(paths: List[str], fmt: str = "auto") -> Iterator[str]:
+    """Iterates over the texts in the files at `paths`.
+    :param fmt: "text", "wikipedia", or "auto" to decide by file name
+    """
+    for path in paths:
+        with _open(path) as f:
+            if fmt == "wikipedia" or (fmt == "auto" and _is_wikipedia_dump(path)):
+                yield from wikipedia_dump(f)
+            else:
+                yield from plaintext(f)
+
+
+def main(
+    paths: List[str],
+    out: str,
+    fmt: str,
+    max_text: int,
+    token_n: int,
+    char_n: int,
+    processes: int,
+    shard_size: int,
+    backoff: bool,
+) -> int:
+    token_builder, char_builder = build_builders(
+        corpus(paths, fmt),
+        token_n,
+        char_n,
+        processes=processes if processes > 0 else None,
+        shard_size=shard_size,
+        max_tokens=max_text,
+        backoff=backoff,
+    )
+    print("Counted {} tokens.".format(token_builder.total))
+    write(to_lang_data(token_builder, char_builder), out)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script builds language data from local text files and "
+        "Wikipedia XML dumps, which may be compressed with gzip or bzip2."
+    )
+    parser.add_argument("paths", nargs="+", help="The paths to the input files.")
+    parser.add_argument(
+        "--out",
+        required=True,
+        help="The path to the output file. If it ends with {}, the output is in "
+        "binary format; otherwise, it is JSON.".format(mapped.SUFFIX),
+    )
+    parser.add_argument(
+        "--format",
+        default="auto",
+        choices=("auto", "text", "wikipedia"),
+        help="The format of the input files. By default, files whose names end with "
+        ".xml, .xml.gz, or .xml.bz2 are read as Wikipedia dumps.",
+    )
+    parser.add_argument(
+        "--max-text",
+        default=-1,
+        help="The approximate maximum number of tokens to collect.",
+        type=int,
+    )
+    parser.add_argument(
+        "--token-n",
+        default=1,
+        help="The number of preceding tokens to consider as context.",
+        type=int,
+    )
+    parser.add_argument(
+        "--char-n",
+        default=2,
+        help="The number of preceding characters to consider as context.",
+        type=int,
+    )
+    parser.add_argument(
+        "--processes",
+        default=0,
+        help="The number of worker processes, or 0 for one per core.",
+        type=int,
+    )
+    parser.add_argument(
+        "--shard-size",
+        default=1000,
+        help="The number of texts given to a worker process at a time.",
+        type=int,
+    )
+    parser.add_argument(
+        "--backoff",
+        action="store_true",
+        help="Count the contexts of every length up to --token-n and --char-n, for "
+        "Markov models that back off from longer contexts to shorter ones. Such data "
+        "can only be written as JSON.",
+    )
+    args = parser.parse_args()
+    sys.exit(
+        main(
+            args.paths,
+            args.out,
+            args.format,
+            args.max_text,
+            args.token_n,
+            args.char_n,
+            args.processes,
+            args.shard_size,
+            args.backoff,
+        )
+    )
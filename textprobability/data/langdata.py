@@ -6,12 +6,31 @@ from typing import Any, cast
 
 from textprobability.core.types import Lexicon, ContextLexicon, Serializable
 from textprobability.core.lexicon import (
+    BackoffContextLexicon,
+    FlatContextLexicon,
     LexiconImpl,
     context_lexicon2serializable,
+    merge_context_lexicons,
+    merge_lexicons,
     serializable2context_lexicon,
 )
 
 
+def _summarize(cl: ContextLexicon, min_n: int) -> ContextLexicon:
+    # A context that is recorded has at least as many observations as any longer
+    # context that it ends, so the suffixes of the contexts that remain also remain.
+    summarized = (
+        BackoffContextLexicon
+        if isinstance(cl, BackoffContextLexicon)
+        else FlatContextLexicon
+    )
+    return summarized(
+        (ngram, cast(LexiconImpl, lexicon).summarize(min_n).to_serializable())
+        for ngram, lexicon in cl.items()
+        if lexicon.n_obs >= min_n
+    )
+
+
 class DefaultLangData(Serializable):
     """Represents the default form taken by language data."""
 
@@ -36,17 +55,27 @@ class DefaultLangData(Serializable):
         """
         return DefaultLangData(
             token_lexicon=self.token_lexicon.summarize(min_n),
-            token_context_lexicon={
-                ngram: cast(LexiconImpl, lexicon).summarize(min_n)
-                for ngram, lexicon in self.token_context_lexicon.items()
-                if lexicon.n_obs >= min_n
-            },
+            token_context_lexicon=_summarize(self.token_context_lexicon, min_n),
             char_lexicon=self.char_lexicon.summarize(min_n),
-            char_context_lexicon={
-                ngram: cast(LexiconImpl, lexicon).summarize(min_n)
-                for ngram, lexicon in self.char_context_lexicon.items()
-                if lexicon.n_obs >= min_n
-            },
+            char_context_lexicon=_summarize(self.char_context_lexicon, min_n),
+        )
+
+    def merge(self, other: "DefaultLangData") -> "DefaultLangData":
+        """Returns language data whose counts are the sums of those of this and of
+        `other`, as if the texts from which `other` was built had been counted together
+        with those from which this was built. Neither this nor `other` is modified.
+        Summarizing discards counts, so data should be merged before they are
+        summarized.
+        """
+        return DefaultLangData(
+            token_lexicon=merge_lexicons(self.token_lexicon, other.token_lexicon),
+            token_context_lexicon=merge_context_lexicons(
+                self.token_context_lexicon, other.token_context_lexicon
+            ),
+            char_lexicon=merge_lexicons(self.char_lexicon, other.char_lexicon),
+            char_context_lexicon=merge_context_lexicons(
+                self.char_context_lexicon, other.char_context_lexicon
+            ),
         )
 
     def to_serializable(self) -> Any:
@@ -0,0 +1,193 @@
+"""Loads language data for the default Ps, with two levels of caching, so that building
+a P for a language that has already been loaded costs next to nothing.
+
+1. Within a process, the language data loaded from each file are kept in a registry
+   and shared by every P that is built from them, until the file changes.
+2. Across processes, the lexicons that are built from JSON are written to a snapshot,
+   which holds their arrays as they are in memory (see `_Trie.__reduce__` in
+   lexicon.py). Loading a snapshot skips parsing and most of building, and the loaded
+   lexicons are as fast as built ones. Snapshots are named by hashes of the path and
+   of the contents of the JSON file, so a file that changes is parsed again instead of
+   being matched with a stale snapshot.
+
+Snapshots are kept in the directory named by the environment variable
+TEXTPROBABILITY_CACHE_DIR, or in textprobability under the user's cache directory
+(XDG_CACHE_HOME, or ~/.cache) by default. If the variable is set to the empty string,
+no snapshots are used. The directory may be emptied at any time. When a snapshot is
+written, the snapshots that it supersedes (those of older versions of the same file, or
+of an older layout) are removed.
+
+Snapshots are pickles, so they are used only if the directory and the snapshot belong
+to the user and no one else can write to them. Where this cannot be checked (on systems
+without POSIX file ownership, such as Windows), snapshots are not used.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import pickle
+import re
+from stat import S_IWGRP, S_IWOTH
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+from textprobability.data import mapped
+from textprobability.data.langdata import DefaultLangData
+
+# The language data loaded by this process, keyed by the path, modification time, and
+# size of their files
+_REGISTRY: Dict[Tuple[str, int, int], DefaultLangData] = {}
+_LOCK = threading.Lock()
+# Locks that keep two threads from loading the same file at once
+_LOADING: Dict[str, threading.Lock] = {}
+# This changes whenever the layout of the lexicons changes, so that old snapshots are
+# not loaded.
+_SNAPSHOT_VERSION = 2
+# Snapshots are named by the version of the layout, a hash of the path of the file, and
+# a hash of its contents.
+_SNAPSHOT_NAME = re.compile(r"v(\d+)-([0-9a-f]{16})-[0-9a-f]{64}\.pickle")
+# The names of the snapshots of earlier layouts, which were named by contents alone
+_UNVERSIONED_SNAPSHOT_NAME = re.compile(r"[0-9a-f]{64}\.(?:tpd|pickle)")
+
+
+def cache_directory() -> Optional[Path]:
+    """Returns the directory that holds snapshots, or None if snapshots are disabled."""
+    directory = os.environ.get("TEXTPROBABILITY_CACHE_DIR")
+    if directory is not None:
+        return Path(directory) if directory else None
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(base) / "textprobability"
+
+
+def _is_private(path: Path) -> bool:
+    """Returns whether `path` belongs to the user and no one else can write to it."""
+    if not hasattr(os, "getuid"):
+        return False
+    try:
+        status = path.stat()
+    except OSError:
+        return False
+    return status.st_uid == os.getuid() and not status.st_mode & (S_IWGRP | S_IWOTH)
+
+
+def _snapshot_directory() -> Optional[Path]:
+    """Returns the directory that holds snapshots, creating it if need be, or None if
+    snapshots are disabled or the directory is not private (see `_is_private`).
+    """
+    directory = cache_directory()
+    if directory is None:
+        return None
+    try:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    except OSError:
+        return None  # The cache directory is not writable, so data are parsed.
+    return directory if _is_private(directory) else None
+
+
+def _sweep(snapshot: Path) -> None:
+    """Removes the snapshots that `snapshot` supersedes."""
+    match = _SNAPSHOT_NAME.fullmatch(snapshot.name)
+    assert match is not None
+    for path in snapshot.parent.iterdir():
+        if path == snapshot:
+            continue
+        other = _SNAPSHOT_NAME.fullmatch(path.name)
+        if other is None:
+            stale = _UNVERSIONED_SNAPSHOT_NAME.fullmatch(path.name) is not None
+        else:
+            stale = int(other.group(1)) != _SNAPSHOT_VERSION or other.group(
+                2
+            ) == match.group(2)
+        if stale:
+            try:
+                path.unlink()
+            except OSError:
+                pass  # Another process removed it first.
+
+
+def _write_snapshot(data: DefaultLangData, snapshot: Path) -> None:
+    """Writes `data` to `snapshot`, if it can, and removes the snapshots that it
+    supersedes. Another process may read `snapshot` at any time, so it is written to a
+    temporary file that then replaces it.
+    """
+    try:
+        fd, temporary = tempfile.mkstemp(dir=snapshot.parent, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, snapshot)
+    except Exception:
+        return  # Snapshots are optional, so data that cannot be pickled are not.
+    finally:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass  # It has replaced the snapshot.
+    _sweep(snapshot)
+
+
+def _load_json(source: Path) -> DefaultLangData:
+    """Loads the JSON language data file at `source`, from its snapshot if there is
+    one.
+    """
+    contents = source.read_bytes()
+    directory = _snapshot_directory()
+    if directory is None:
+        return DefaultLangData.from_serializable(json.loads(contents))
+    snapshot = directory / "v{}-{}-{}.pickle".format(
+        _SNAPSHOT_VERSION,
+        hashlib.sha256(str(source).encode("utf-8", "surrogatepass")).hexdigest()[:16],
+        hashlib.sha256(contents).hexdigest(),
+    )
+    if _is_private(snapshot):
+        try:
+            with open(snapshot, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # The snapshot is unreadable (for whatever reason), so it is replaced.
+    data = DefaultLangData.from_serializable(json.loads(contents))
+    _write_snapshot(data, snapshot)
+    return data
+
+
+def load(source) -> DefaultLangData:
+    """Returns the language data in the file at `source`, which is in binary format if
+    its name ends with `mapped.SUFFIX` and in JSON otherwise. The same object is
+    returned for the same file until the file changes, so it must not be modified.
+    """
+    source = Path(source).resolve()
+    stat = source.stat()
+    key = (str(source), stat.st_mtime_ns, stat.st_size)
+    with _LOCK:
+        data = _REGISTRY.get(key)
+        if data is not None:
+            return data
+        lock = _LOADING.setdefault(key[0], threading.Lock())
+    with lock:
+        with _LOCK:
+            data = _REGISTRY.get(key)
+        if data is None:
+            if source.name.endswith(mapped.SUFFIX):
+                data = mapped.load(source)
+            else:
+                data = _load_json(source)
+            with _LOCK:
+                # The language data of older versions of the file are no longer needed.
+                for stale in [k for k in _REGISTRY if k[0] == key[0]]:
+                    del _REGISTRY[stale]
+                _REGISTRY[key] = data
+        return data
+
+
+def clear() -> None:
+    """Forgets the language data that have been loaded, so that they are loaded again
+    the next time that they are needed. Snapshots on disk are kept.
+    """
+    with _LOCK:
+        _REGISTRY.clear()
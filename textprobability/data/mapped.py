@@ -0,0 +1,506 @@
+"""Implements a compact binary format for language data. Files in this format are
+memory-mapped and queried in place, so loading them costs next to nothing: no JSON is
+parsed and no Python objects are built for the units and contexts that they describe.
+
+A file consists of
+- the magic string `MAGIC`,
+- the length of the header as an unsigned 64-bit little-endian integer,
+- the header, which is a JSON object that locates each array in the data section, and
+- the data section, in which each array is aligned to `_ALIGNMENT` bytes.
+
+For each level of linguistic unit ("token" and "char"), the data section holds
+- a string table of the units, sorted by their UTF-8 encodings, that assigns to each
+  unit an ID (its index in the table),
+- the key of each unit, which is the first 8 bytes of its encoding (padded with zeros)
+  as a big-endian integer, so that units are found by bisecting integers,
+- the count of each unit in the lexicon, indexed by ID (-1 marks unobserved units),
+- the contexts of the context lexicon, as rows of unit IDs in lexicographic order,
+- the number of observations of each context, and
+- for each context, a slice of the entries that follow it, each entry being the ID of
+  a unit and its count. Entries are sorted by ID within each slice.
+"""
+
+import argparse
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+import json
+from math import log
+import mmap
+from pathlib import Path
+import sys
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from textprobability.core.lexicon import LexiconImpl
+from textprobability.core.types import (
+    ContextLexicon,
+    Lexicon,
+    LogProbability,
+    NGram,
+    Probability,
+    Unit,
+)
+from textprobability.data.langdata import DefaultLangData
+
+MAGIC = b"TPDATA01"
+SUFFIX = ".tpd"
+_ALIGNMENT = 8
+_LEVELS = ("token", "char")
+
+
+def _encode(unit: Unit) -> bytes:
+    return unit.encode("utf-8", "surrogatepass")
+
+
+def _decode(encoded: bytes) -> Unit:
+    return encoded.decode("utf-8", "surrogatepass")
+
+
+def _key(encoded: bytes) -> int:
+    return int.from_bytes(encoded[:8].ljust(8, b"\0"), "big")
+
+
+class _Units:
+    """A string table that maps linguistic units to IDs and back."""
+
+    def __init__(
+        self,
+        strings: memoryview,
+        offsets: Sequence[int],
+        keys: Optional[Sequence[int]] = None,
+    ):
+        """:param keys: The key of each unit. Files written before keys were stored do
+        not have them, so they are computed.
+        """
+        self._strings = strings
+        self._offsets = offsets
+        if keys is None:
+            keys = array("Q", [_key(self[i]) for i in range(len(self))])
+        self._keys = keys
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        """Returns the encoding of the unit with ID `i`."""
+        return self._strings[self._offsets[i] : self._offsets[i + 1]].tobytes()
+
+    def id(self, unit: Unit) -> Optional[int]:
+        """Returns the ID of `unit`, or None if `unit` is not in the table."""
+        encoded = _encode(unit)
+        key, keys, offsets = _key(encoded), self._keys, self._offsets
+        i = bisect_left(keys, key)
+        # The units that share a key are consecutive. Those of at most 8 bytes are
+        # equal if their lengths are; longer ones are compared in place.
+        while i < len(keys) and keys[i] == key:
+            start, end = offsets[i], offsets[i + 1]
+            if end - start == len(encoded) and (
+                len(encoded) <= 8 or self._strings[start:end] == encoded
+            ):
+                return i
+            i += 1
+        return None
+
+    def unit(self, i: int) -> Unit:
+        """Returns the unit with ID `i`."""
+        return _decode(self[i])
+
+
+class MappedLexicon(Lexicon):
+    """A Lexicon that is queried in place in a buffer."""
+
+    def __init__(self, units: _Units, counts: Sequence[int], n_obs: int):
+        self._units = units
+        self._counts = counts
+        super().__init__(n_obs)
+
+    def _count(self, key: Unit) -> int:
+        i = self._units.id(key)
+        return -1 if i is None else self._counts[i]
+
+    def __getitem__(self, key: Unit) -> Probability:
+        count = self._count(key)
+        if count < 0:
+            raise KeyError(key)
+        return count / self.n_obs
+
+    def get(
+        self, key: Unit, default: Optional[Probability] = None
+    ) -> Optional[Probability]:
+        count = self._count(key)
+        return default if count < 0 else count / self.n_obs
+
+    def counts(self) -> Iterator[Tuple[Unit, int]]:
+        """Iterates over the observed units and their counts."""
+        for i, count in enumerate(self._counts):
+            if count >= 0:
+                yield self._units.unit(i), count
+
+    def summarize(self, min_n) -> LexiconImpl:
+        """See `LexiconImpl.summarize`."""
+        return LexiconImpl(dict(self.counts()), self.n_obs).summarize(min_n)
+
+    def to_serializable(self) -> Any:
+        return (dict(self.counts()), self.n_obs)
+
+
+class _MappedEntries(MappedLexicon):
+    """The Lexicon that follows a single context in a MappedContextLexicon."""
+
+    def __init__(
+        self,
+        units: _Units,
+        entry_units: Sequence[int],
+        entry_counts: Sequence[int],
+        lo: int,
+        hi: int,
+        n_obs: int,
+    ):
+        self._entry_units = entry_units
+        self._lo = lo
+        self._hi = hi
+        super().__init__(units, entry_counts, n_obs)
+
+    def _count(self, key: Unit) -> int:
+        unit_id = self._units.id(key)
+        if unit_id is None:
+            return -1
+        i = bisect_left(self._entry_units, unit_id, self._lo, self._hi)
+        if i < self._hi and self._entry_units[i] == unit_id:
+            return self._counts[i]
+        return -1
+
+    def counts(self) -> Iterator[Tuple[Unit, int]]:
+        for i in range(self._lo, self._hi):
+            yield self._units.unit(self._entry_units[i]), self._counts[i]
+
+
+class _Rows:
+    """Presents the contexts of a MappedContextLexicon as a sequence of ID tuples."""
+
+    def __init__(self, contexts: Sequence[int], n: int):
+        self._contexts = contexts
+        self._n = n
+
+    def __len__(self) -> int:
+        return len(self._contexts) // self._n if self._n else 0
+
+    def __getitem__(self, i: int) -> Tuple[int, ...]:
+        return tuple(self._contexts[i * self._n : (i + 1) * self._n])
+
+
+class MappedContextLexicon(Mapping):
+    """A ContextLexicon that is queried in place in a buffer. Like a
+    FlatContextLexicon, it also computes the probabilities of whole sequences itself.
+    """
+
+    def __init__(
+        self,
+        units: _Units,
+        n: int,
+        contexts: Sequence[int],
+        context_counts: Sequence[int],
+        bounds: Sequence[int],
+        entry_units: Sequence[int],
+        entry_counts: Sequence[int],
+    ):
+        self.n = n
+        self._units = units
+        self._rows = _Rows(contexts, n)
+        # The j-th unit of each context. Contexts are sorted, so within the contexts
+        # that agree in their first j units, the j-th units are sorted.
+        self._columns = [contexts[j::n] for j in range(n)]
+        self._context_counts = context_counts
+        self._bounds = bounds
+        self._entry_units = entry_units
+        self._entry_counts = entry_counts
+
+    def _ids(self, units: Sequence[Unit]) -> List[int]:
+        """Returns the ID of each unit of `units`, or -1 for units not in the table."""
+        ids = []
+        for unit in units:
+            unit_id = self._units.id(unit)
+            ids.append(-1 if unit_id is None else unit_id)
+        return ids
+
+    def _row(self, ids: Sequence[int]) -> Optional[int]:
+        """Returns the index of the context whose units have the IDs `ids`, or None if
+        there is none.
+        """
+        lo, hi = 0, len(self._rows)
+        for column, unit_id in zip(self._columns, ids):
+            lo = bisect_left(column, unit_id, lo, hi)
+            hi = bisect_right(column, unit_id, lo, hi)
+        return lo if lo < hi else None
+
+    def _index(self, ngram: NGram) -> Optional[int]:
+        if len(ngram) != self.n:
+            return None
+        ids = self._ids(ngram)
+        return None if -1 in ids else self._row(ids)
+
+    def _conditional(self, ids: Sequence[int]) -> Optional[Probability]:
+        """Returns the probability of the unit whose ID is `ids[-1]` given the context
+        of the others, or None if it is not recorded.
+        """
+        if -1 in ids:
+            return None
+        i = self._row(ids[:-1])
+        if i is None:
+            return None
+        lo, hi = self._bounds[i], self._bounds[i + 1]
+        j = bisect_left(self._entry_units, ids[-1], lo, hi)
+        if j < hi and self._entry_units[j] == ids[-1]:
+            return self._entry_counts[j] / self._context_counts[i]
+        return None
+
+    def _entries(self, i: int) -> _MappedEntries:
+        return _MappedEntries(
+            self._units,
+            self._entry_units,
+            self._entry_counts,
+            self._bounds[i],
+            self._bounds[i + 1],
+            self._context_counts[i],
+        )
+
+    def __getitem__(self, ngram: NGram) -> Lexicon:
+        i = self._index(ngram)
+        if i is None:
+            raise KeyError(ngram)
+        return self._entries(i)
+
+    def __contains__(self, ngram: object) -> bool:
+        return isinstance(ngram, tuple) and self._index(ngram) is not None
+
+    def __iter__(self) -> Iterator[NGram]:
+        for i in range(len(self._rows)):
+            yield tuple(self._units.unit(unit_id) for unit_id in self._rows[i])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_conditional(
+        self, context: Sequence[Unit], unit: Unit, default: Optional[Probability] = None
+    ) -> Optional[Probability]:
+        """See `FlatContextLexicon.get_conditional`."""
+        if len(context) != self.n:
+            return default
+        p = self._conditional(self._ids([*context, unit]))
+        return default if p is None else p
+
+    def log_get_conditional(
+        self,
+        context: Sequence[Unit],
+        unit: Unit,
+        default: Optional[LogProbability] = None,
+    ) -> Optional[LogProbability]:
+        """Returns the log-probability of `unit` given `context`, or `default`."""
+        p = self.get_conditional(context, unit)
+        if p is None:
+            return default
+        return log(p) if p > 0 else float("-inf")
+
+    def conditionals(self, sequence: Sequence[Unit]) -> List[Optional[Probability]]:
+        """See `FlatContextLexicon.conditionals`."""
+        n, conditional = self.n, self._conditional
+        ids = self._ids(sequence)
+        ret: List[Optional[Probability]] = [None] * n
+        for i in range(n, len(ids)):
+            ret.append(conditional(ids[i - n : i + 1]))
+        return ret
+
+    def log_conditionals(
+        self, sequence: Sequence[Unit]
+    ) -> List[Optional[LogProbability]]:
+        """Returns the logarithms of `self.conditionals(sequence)`."""
+        return [
+            None if p is None else log(p) if p > 0 else float("-inf")
+            for p in self.conditionals(sequence)
+        ]
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGNMENT) * _ALIGNMENT
+
+
+def _level_arrays(
+    lexicon: Lexicon, context_lexicon: ContextLexicon
+) -> Tuple[Dict[str, Any], int, int]:
+    """Returns the arrays that describe one level of linguistic unit, the number of
+    observations of its lexicon, and the length of the contexts of its context lexicon.
+    """
+    counts, n_obs = lexicon.to_serializable()
+    contexts = [
+        (ngram, *context_lexicon[ngram].to_serializable()) for ngram in context_lexicon
+    ]
+    if len({len(ngram) for ngram, _, _ in contexts}) > 1:
+        raise ValueError(
+            "Contexts that vary in length cannot be stored in the binary format."
+        )
+    units = sorted(
+        set(counts).union(
+            *(ngram for ngram, _, _ in contexts),
+            *(entries for _, entries, _ in contexts)
+        ),
+        key=_encode,
+    )
+    ids = {unit: i for i, unit in enumerate(units)}
+    encoded = [_encode(unit) for unit in units]
+    offsets = array("Q", [0])
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    rows = sorted(
+        (tuple(ids[unit] for unit in ngram), entries, n)
+        for ngram, entries, n in contexts
+    )
+    arrays: Dict[str, Any] = {
+        "strings": array("B", b"".join(encoded)),
+        "offsets": offsets,
+        "keys": array("Q", [_key(e) for e in encoded]),
+        "counts": array("q", [counts.get(unit, -1) for unit in units]),
+        "contexts": array("I", [unit_id for row, _, _ in rows for unit_id in row]),
+        "context_counts": array("q", [n for _, _, n in rows]),
+        "bounds": array("Q", [0]),
+        "entry_units": array("I"),
+        "entry_counts": array("q"),
+    }
+    for _, entries, _ in rows:
+        for unit_id, count in sorted((ids[unit], c) for unit, c in entries.items()):
+            arrays["entry_units"].append(unit_id)
+            arrays["entry_counts"].append(count)
+        arrays["bounds"].append(len(arrays["entry_units"]))
+    return arrays, n_obs, len(rows[0][0]) if rows else 0
+
+
+def dump(data: DefaultLangData, f: BinaryIO) -> None:
+    """Writes `data` to the binary file `f`."""
+    header: Dict[str, Any] = {
+        "byteorder": sys.byteorder,
+        "n_obs": {},
+        "context_len": {},
+        "arrays": {},
+    }
+    chunks: List[bytes] = []
+    position = 0
+    for level, lexicon, context_lexicon in (
+        ("token", data.token_lexicon, data.token_context_lexicon),
+        ("char", data.char_lexicon, data.char_context_lexicon),
+    ):
+        arrays, header["n_obs"][level], header["context_len"][level] = _level_arrays(
+            lexicon, context_lexicon
+        )
+        for name, a in arrays.items():
+            chunk = a.tobytes()
+            padding = _aligned(len(chunk)) - len(chunk)
+            header["arrays"]["{}_{}".format(level, name)] = [
+                position,
+                len(a),
+                a.typecode,
+            ]
+            chunks.append(chunk + b"\0" * padding)
+            position += len(chunk) + padding
+    encoded_header = json.dumps(header).encode("utf-8")
+    f.write(MAGIC)
+    f.write(len(encoded_header).to_bytes(8, "little"))
+    f.write(encoded_header)
+    f.write(b"\0" * (_aligned(len(encoded_header)) - len(encoded_header)))
+    for chunk in chunks:
+        f.write(chunk)
+
+
+def from_buffer(buffer: Any) -> DefaultLangData:
+    """Returns the DefaultLangData stored in `buffer`, which must support the buffer
+    protocol and must outlive the returned object. Nothing is copied out of `buffer`.
+    """
+    view = memoryview(buffer)
+    if view[: len(MAGIC)].tobytes() != MAGIC:
+        raise ValueError("This buffer does not hold language data in binary format.")
+    header_len = int.from_bytes(view[len(MAGIC) : len(MAGIC) + 8], "little")
+    header_start = len(MAGIC) + 8
+    header = json.loads(view[header_start : header_start + header_len].tobytes())
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(
+            "This language data was written on a machine with {} byte order.".format(
+                header["byteorder"]
+            )
+        )
+    data_start = header_start + _aligned(header_len)
+
+    def get(name: str) -> memoryview:
+        offset, length, typecode = header["arrays"][name]
+        start = data_start + offset
+        itemsize = array(typecode).itemsize
+        return view[start : start + length * itemsize].cast(typecode)
+
+    levels = []
+    for level in _LEVELS:
+        units = _Units(
+            get(level + "_strings"),
+            get(level + "_offsets"),
+            get(level + "_keys") if level + "_keys" in header["arrays"] else None,
+        )
+        levels.append(
+            (
+                MappedLexicon(units, get(level + "_counts"), header["n_obs"][level]),
+                MappedContextLexicon(
+                    units,
+                    header["context_len"][level],
+                    get(level + "_contexts"),
+                    get(level + "_context_counts"),
+                    get(level + "_bounds"),
+                    get(level + "_entry_units"),
+                    get(level + "_entry_counts"),
+                ),
+            )
+        )
+    (token_lexicon, token_context_lexicon), (char_lexicon, char_context_lexicon) = (
+        levels
+    )
+    return DefaultLangData(
+        token_lexicon,  # type: ignore
+        token_context_lexicon,  # type: ignore
+        char_lexicon,  # type: ignore
+        char_context_lexicon,  # type: ignore
+    )
+
+
+def load(path) -> DefaultLangData:
+    """Memory-maps the binary language data file at `path`."""
+    with open(path, "rb") as f:
+        return from_buffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def convert(source, destination) -> None:
+    """Converts the JSON language data file at `source` to a binary file at
+    `destination`.
+    """
+    with open(source) as f:
+        data = DefaultLangData.from_serializable(json.load(f))
+    with open(destination, "wb") as f:
+        dump(data, f)
+
+
+def main(sources: List[str], out_dir: Optional[str]) -> int:
+    for source in sources:
+        destination = Path(source).with_suffix(SUFFIX)
+        if out_dir is not None:
+            destination = Path(out_dir) / destination.name
+        print("Converting {} to {}...".format(source, destination))
+        convert(source, destination)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script converts JSON language data to the binary format."
+    )
+    parser.add_argument("sources", nargs="+", help="The paths to the JSON files.")
+    parser.add_argument(
+        "--out-dir",
+        default=None,
+        help="The directory of the output files. By default, each output file is "
+        "placed next to its source.",
+    )
+    args = parser.parse_args()
+    sys.exit(main(args.sources, args.out_dir))
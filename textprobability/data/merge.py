@@ -0,0 +1,117 @@
+"""Merges language data files (see `DefaultLangData.merge`), such as the partial results
+of builds from different parts of a corpus, or an existing model and the result of a
+build from new texts. Updating a model in this way costs time in proportion to the size
+of the new texts and of the model, and not to the size of the corpus from which the
+model was built.
+
+Files are merged in pairs, and the results in pairs again, until one file remains, so
+that the pairs at each stage can be merged in parallel. Intermediate results are kept
+in the binary format (see mapped.py), which is quick to load.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+from textprobability.core.lexicon import BackoffContextLexicon
+from textprobability.data import mapped
+from textprobability.data.langdata import DefaultLangData
+
+
+def read(path) -> DefaultLangData:
+    """Loads the language data file at `path`, in binary format if its name ends with
+    `mapped.SUFFIX` and in JSON otherwise.
+    """
+    if str(path).endswith(mapped.SUFFIX):
+        return mapped.load(path)
+    with open(path) as f:
+        return DefaultLangData.from_serializable(json.load(f))
+
+
+def write(data: DefaultLangData, path) -> None:
+    """Writes `data` to `path`, in the format that `read` expects."""
+    if str(path).endswith(mapped.SUFFIX):
+        with open(path, "wb") as f:
+            mapped.dump(data, f)
+    else:
+        with open(path, "w") as f:
+            json.dump(data.to_serializable(), f)
+
+
+def _merge(job: Tuple[str, str, str]) -> str:
+    a, b, destination = job
+    data = read(a).merge(read(b))
+    if destination.endswith(mapped.SUFFIX) and any(
+        isinstance(cl, BackoffContextLexicon)
+        for cl in (data.token_context_lexicon, data.char_context_lexicon)
+    ):
+        # Contexts that vary in length cannot be stored in the binary format.
+        destination = destination[: -len(mapped.SUFFIX)] + ".json"
+    write(data, destination)
+    return destination
+
+
+def merge(paths: List[str], out: str, processes: Optional[int] = None) -> None:
+    """Merges the language data files at `paths` into one file at `out`.
+    :param processes: The number of worker processes, or None for one per core
+    """
+    if not paths:
+        raise ValueError("There is nothing to merge.")
+    scratch = tempfile.mkdtemp(prefix="textprobability-merge-")
+    pool = None if processes == 1 else multiprocessing.Pool(processes)
+    try:
+        stage = 0
+        while len(paths) > 2:
+            jobs = [
+                (a, b, os.path.join(scratch, "{}-{}{}".format(stage, i, mapped.SUFFIX)))
+                for i, (a, b) in enumerate(zip(paths[::2], paths[1::2]))
+            ]
+            merged = list(map(_merge, jobs) if pool is None else pool.map(_merge, jobs))
+            paths = merged + paths[2 * len(jobs) :]
+            stage += 1
+        if len(paths) == 2:
+            _merge((paths[0], paths[1], out))
+        else:
+            write(read(paths[0]), out)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main(paths: List[str], out: str, processes: int) -> int:
+    if Path(out).exists():
+        print("{} already exists.".format(out))
+        return 1
+    merge(paths, out, processes if processes > 0 else None)
+    print("Merged {} files into {}.".format(len(paths), out))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script merges language data files, in JSON or in binary "
+        "format, into one."
+    )
+    parser.add_argument("paths", nargs="+", help="The paths to the input files.")
+    parser.add_argument(
+        "--out",
+        required=True,
+        help="The path to the output file. If it ends with {}, the output is in "
+        "binary format; otherwise, it is JSON.".format(mapped.SUFFIX),
+    )
+    parser.add_argument(
+        "--processes",
+        default=0,
+        help="The number of worker processes, or 0 for one per core.",
+        type=int,
+    )
+    args = parser.parse_args()
+    sys.exit(main(args.paths, args.out, args.processes))
@@ -0,0 +1,70 @@
+"""Shares language data among processes, so that memory use does not grow with the
+number of processes that score text.
+
+Language data in the binary format (see mapped.py) is memory-mapped and queried in
+place, so every process that loads the same file shares one copy of it in the page
+cache. Deserialized language data, by contrast, is copied into every process: even
+after a fork, reference counting writes to (and so copies) the pages of every object.
+`SharedData` therefore converts the language data of the given languages to the binary
+format once, in a directory that is backed by memory where possible, and each worker
+loads the default Ps (or a classifier) from that directory.
+
+    with SharedData(["en", "fr"]) as shared:
+        with multiprocessing.Pool(32) as pool:
+            ...  # Each worker calls, e.g., classifier(priors, path=shared.path).
+"""
+
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Any, Iterable, Optional
+
+from textprobability.core.defaults import DEFAULT_DATA_PATH
+from textprobability.data import mapped
+
+# A file system that is backed by memory, if there is one
+_SHM = "/dev/shm"
+
+
+class SharedData:
+    """A directory that holds the language data of several languages in binary format.
+    The directory is removed by `close`.
+    """
+
+    def __init__(
+        self,
+        langcodes: Iterable[str],
+        path=DEFAULT_DATA_PATH,
+        directory: Optional[str] = None,
+    ):
+        """:param langcodes: The BCP-47 codes of the languages to share
+        :param path: The directory that holds the language data
+        :param directory: The directory in which to create the shared directory. By
+            default, /dev/shm is used if it exists, and the default temporary directory
+            is used otherwise.
+        """
+        if directory is None and os.path.isdir(_SHM):
+            directory = _SHM
+        self.path = tempfile.mkdtemp(prefix="textprobability-", dir=directory)
+        try:
+            for langcode in langcodes:
+                name = langcode + mapped.SUFFIX
+                destination = Path(self.path) / name
+                if (Path(path) / name).exists():
+                    # It is already in binary format, so it can be mapped where it is.
+                    os.symlink((Path(path) / name).resolve(), destination)
+                else:
+                    mapped.convert(Path(path) / (langcode + ".json"), destination)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> "SharedData":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -1,18 +1,258 @@
-"""This is just a little script for summarizing these big JSON files."""
+"""Summarizes JSON language data, reducing the amount of space required to store it.
 
+Each file is parsed and written as a stream: units and contexts that are observed fewer
+than `min_n` times are dropped as they are read, and the rest are written out
+immediately. At most one lexicon is held in memory at a time, so memory use does not
+grow with the size of the data. Files (one per language) are summarized in parallel
+worker processes.
+"""
+
+import argparse
 import json
+import multiprocessing
 import os
+from pathlib import Path
+import re
+import sys
+from typing import Any, IO, Iterator, List, Optional, Tuple
+
+from textprobability.core.lexicon import SerializableLexicon
+from textprobability.core.types import NGram
+
+_LEXICONS = ("token_lexicon", "char_lexicon")
+_CONTEXT_LEXICONS = ("token_context_lexicon", "char_context_lexicon")
+_NON_WHITESPACE = re.compile(r"\S")
+_DECODER = json.JSONDecoder()
+# The separators that `json.dumps` uses by default, which are used throughout, so that
+# the output is formatted like `json.dumps` of the summarized data. It is equivalent
+# JSON, but the keys of a trie are written in the order in which they are read.
+_ITEM_SEPARATOR, _KEY_SEPARATOR = ", ", ": "
+
+
+class _Reader:
+    """Reads a JSON document from a text stream one piece at a time."""
+
+    def __init__(self, f: IO[str], chunk_size: int = 2**16):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+
+    def _fill(self) -> bool:
+        """Reads more of the stream into the buffer. Returns whether there was more to
+        read.
+        """
+        # Reading at least as much as is buffered keeps the cost of decoding a long
+        # value that spans many reads linear in its length.
+        chunk = self._f.read(max(self._chunk_size, len(self._buffer) - self._position))
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Returns the next character that is not whitespace, or "" at the end of the
+        stream.
+        """
+        while True:
+            match = _NON_WHITESPACE.search(self._buffer, self._position)
+            if match is not None:
+                self._position = match.start()
+                return self._buffer[self._position]
+            self._position = len(self._buffer)
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Consumes the next character that is not whitespace, which must be `char`."""
+        if self.peek() != char:
+            raise ValueError(
+                "Expected {!r} but found {!r}.".format(
+                    char, self._buffer[self._position : self._position + 20]
+                )
+            )
+        self._position += 1
+
+    def value(self) -> Any:
+        """Consumes and returns the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer might continue in the stream.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._position = end
+            return value
+
+    def keys(self) -> Iterator[str]:
+        """Consumes a JSON object, yielding each of its keys. The value of each key must
+        be consumed before the next key is requested.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.expect("}")
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == "}":
+                self.expect("}")
+                return
+            self.expect(",")
+
+    def items(self) -> Iterator[Any]:
+        """Consumes a JSON array, yielding each of its items."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.expect("]")
+            return
+        while True:
+            yield self.value()
+            if self.peek() == "]":
+                self.expect("]")
+                return
+            self.expect(",")
+
+
+def _entries(reader: _Reader, parents: NGram = ()) -> Iterator[Tuple[NGram, Any]]:
+    """Consumes a trie like the output of `context_lexicon2serializable`, yielding
+    each context and its serializable lexicon.
+    """
+    if reader.peek() != "{":
+        yield parents, reader.value()
+        return
+    for key in reader.keys():
+        yield from _entries(reader, (*parents, key))
+
+
+def _write_trie(f: IO[str], entries: Iterator[Tuple[NGram, Any]]) -> None:
+    """Writes `entries` to `f` as a trie like the output of
+    `context_lexicon2serializable`. Contexts that share a prefix must be consecutive.
+    """
+    f.write("{")
+    path: List[str] = []  # The keys of the objects that are open.
+    separator = ""
+    for ngram, serializable in entries:
+        common = 0
+        while common < min(len(path), len(ngram) - 1) and path[common] == ngram[common]:
+            common += 1
+        if common < len(path):
+            f.write("}" * (len(path) - common))
+            del path[common:]
+            separator = _ITEM_SEPARATOR
+        for key in ngram[common:-1]:
+            f.write(separator + json.dumps(key) + _KEY_SEPARATOR + "{")
+            path.append(key)
+            separator = ""
+        f.write(
+            separator
+            + json.dumps(ngram[-1])
+            + _KEY_SEPARATOR
+            + json.dumps(serializable)
+        )
+        separator = _ITEM_SEPARATOR
+    f.write("}" * (len(path) + 1))
+
+
+def summarize_lexicon(serializable: Any, min_n: int) -> SerializableLexicon:
+    """Summarizes a serializable lexicon in the way that `LexiconImpl.summarize`
+    summarizes a lexicon.
+    """
+    counts, _ = serializable
+    filtered = {unit: count for unit, count in counts.items() if count >= min_n}
+    return filtered, sum(filtered.values())
+
+
+def summarize(source, destination, min_n: int = 5) -> None:
+    """Writes to `destination` the summary of the JSON language data file at `source`.
+    The result is the same as that of `DefaultLangData.summarize`.
+    :param source: The path to the language data to summarize
+    :param destination: The path of the output file. It may be the same as `source`.
+    :param min_n: The minimum number of observations of a linguistic unit for it to be
+        recorded as observed
+    """
+    temporary = str(destination) + ".tmp"
+    with open(source) as f, open(temporary, "w") as out:
+        reader = _Reader(f)
+        separator = "{"
+        for key in reader.keys():
+            out.write(separator + json.dumps(key) + _KEY_SEPARATOR)
+            separator = _ITEM_SEPARATOR
+            if key in _CONTEXT_LEXICONS and reader.peek() == "[":
+                # The contexts of a BackoffContextLexicon are listed.
+                out.write("[")
+                item_separator = ""
+                for ngram, counts, n_obs in reader.items():
+                    if n_obs >= min_n:
+                        serializable = summarize_lexicon((counts, n_obs), min_n)
+                        out.write(item_separator + json.dumps([ngram, *serializable]))
+                        item_separator = _ITEM_SEPARATOR
+                out.write("]")
+            elif key in _CONTEXT_LEXICONS:
+                _write_trie(
+                    out,
+                    (
+                        (ngram, summarize_lexicon(serializable, min_n))
+                        for ngram, serializable in _entries(reader)
+                        if serializable[1] >= min_n
+                    ),
+                )
+            elif key in _LEXICONS:
+                out.write(json.dumps(summarize_lexicon(reader.value(), min_n)))
+            else:
+                raise ValueError("Unexpected key {!r} in {}.".format(key, source))
+        out.write("}")
+    os.replace(temporary, destination)
+
+
+def _summarize(job: Tuple[str, Path, int]) -> Tuple[str, Path]:
+    source, destination, min_n = job
+    summarize(source, destination, min_n)
+    return source, destination
+
 
-from textprobability.data.langdata import DefaultLangData
+def main(sources: List[str], out_dir: str, min_n: int, processes: Optional[int]) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(source, Path(out_dir) / Path(source).name, min_n) for source in sources]
+    if processes == 1 or len(jobs) == 1:
+        for job in jobs:
+            print("Summarized {} to {}.".format(*_summarize(job)))
+        return 0
+    with multiprocessing.Pool(processes) as pool:
+        for summarized in pool.imap_unordered(_summarize, jobs):
+            print("Summarized {} to {}.".format(*summarized))
+    return 0
 
-DATA_DIR = "./textprobability/data"
 
-for filename in os.listdir(DATA_DIR):
-    if not filename.endswith(".json"):
-        continue
-    path = os.path.join(DATA_DIR, filename)
-    with open(path) as f:
-        full_data = DefaultLangData.from_serializable(json.loads(f.read()))
-    os.renames(path, os.path.join(DATA_DIR, "full", filename))
-    with open(path, "w") as f:
-        f.write(json.dumps(full_data.summarize(min_n=5).to_serializable()))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script summarizes JSON language data, dropping units and "
+        "contexts that are rarely observed."
+    )
+    parser.add_argument("sources", nargs="+", help="The paths to the JSON files.")
+    parser.add_argument(
+        "--out-dir",
+        required=True,
+        help="The directory of the output files, each of which has the same name as "
+        "its source. If this is the directory of the sources, they are replaced.",
+    )
+    parser.add_argument(
+        "--min-n",
+        default=5,
+        help="The minimum number of observations of a linguistic unit for it to be "
+        "recorded as observed.",
+        type=int,
+    )
+    parser.add_argument(
+        "--processes",
+        default=None,
+        help="The number of worker processes. By default, one is used per CPU.",
+        type=int,
+    )
+    args = parser.parse_args()
+    sys.exit(main(args.sources, args.out_dir, args.min_n, args.processes))
@@ -1,10 +1,18 @@
 """Traverse the Internet via hyperlinks."""
 
-from typing import Callable, Iterable, Iterator, List, Optional, Set
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+import threading
+import time
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
 from bs4 import BeautifulSoup
 import requests
 from numpy.random import Generator
 
+from textprobability.data.filters import BloomFilter
+
 UrlResolver = Callable[[str], str]
 
 NON_TEXTUAL_HTML_TAGS = (
@@ -50,6 +58,43 @@ NON_TEXTUAL_HTML_TAGS = (
 )
 
 
+class WalkState:
+    """The progress of a walk. A walk that is given the state of an earlier walk
+    (together with a random number generator in the same state) resumes it.
+    """
+
+    def __init__(self, start: str, visited: Optional[BloomFilter] = None):
+        """:param start: The URL of the page at which the walk starts
+        :param visited: An empty filter in which to record visited pages, which bounds
+            the memory that the walk takes. By default, it holds a million pages with a
+            false positive rate of 0.001 (and warns when more pages are visited). A
+            page that is falsely reported as visited is not visited.
+        """
+        self.fringe: List[str] = [start]
+        # The index in `self.fringe` of the next page to visit.
+        self.position = 0
+        # The hyperlinks found so far in the pages of `self.fringe`.
+        self.new_fringe: List[str] = []
+        self.visited = BloomFilter() if visited is None else visited
+        # The pages visited since `recently_visited` was last cleared.
+        self.recently_visited: List[str] = []
+
+    def visit(self, url: str) -> None:
+        """Marks `url` as visited."""
+        self.visited.add(url)
+        self.recently_visited.append(url)
+        self.position += 1
+
+    def advance(self, rng: Generator, fringe_size: int) -> None:
+        """Replaces the fringe with a sample of the hyperlinks found in it, which is
+        empty if none were found.
+        """
+        new_fringe = self.new_fringe
+        if len(new_fringe) > fringe_size:
+            new_fringe = list(rng.choice(new_fringe, fringe_size))
+        self.fringe, self.position, self.new_fringe = new_fringe, 0, []
+
+
 def web_walk(
     start: str,
     rng: Generator,
@@ -58,8 +103,12 @@ def web_walk(
     url_resolver: UrlResolver = lambda s: s,
     exclude=NON_TEXTUAL_HTML_TAGS,
     verbose: bool = False,
+    state: Optional[WalkState] = None,
+    timeout: float = 30,
+    min_interval: float = 0,
 ) -> Iterator[str]:
-    """Iterates over the web pages that are reachable from `start`.
+    """Iterates over the web pages that are reachable from `start`. The walk ends when
+    the pages of its fringe link to no page that it has not visited.
     :param start: The URL of a website
     :param desired_text_len: The desired amount of text (in characters)
     :param rng: The random number generator that determines which sites
@@ -73,17 +122,23 @@ def web_walk(
     :param exclude: HTML subtree types to exclude from the output, as
         denoted by their HTML tags
     :param verbose: Whether to print verbose output
+    :param state: The state of the walk, which is updated after each page
+        is fetched and before it is yielded. If given, `start` is ignored.
+    :param timeout: The maximum number of seconds to wait for a server
+    :param min_interval: The minimum number of seconds between the starts of two
+        requests to the same host
     """
-    visited = set()
+    state = WalkState(start) if state is None else state
+    visited = state.visited
+    # The session pools connections, so that pages of the same host are fetched over
+    # one connection.
+    session = requests.Session()
+    rate_limiter = _RateLimiter(min_interval)
 
-    def filtered(soup: BeautifulSoup) -> Iterable[str]:
+    def filtered(hrefs: List[str]) -> Iterable[str]:
         return {
             resolved
-            for resolved in [
-                url_resolver(a.get("href"))
-                for a in soup.find_all("a")
-                if a.get("href") is not None
-            ]
+            for resolved in [url_resolver(href) for href in hrefs]
             if resolved not in visited
             and (
                 websites is None
@@ -91,25 +146,142 @@ def web_walk(
             )
         }
 
-    fringe: List[str] = [start]
-    while True:
-        new_fringe: List[str] = []
-        for url in fringe:
+    while state.fringe:
+        while state.position < len(state.fringe):
+            url = state.fringe[state.position]
             if verbose:
                 print("Visiting {}...".format(url))
-            visited.add(url)
-            try:
-                response = requests.get(url_resolver(url))
-            except requests.exceptions.RequestException:
+            page = _page(url_resolver(url), session.get, rate_limiter, timeout, exclude)
+            # The state is updated only once the page has been fetched, so that a walk
+            # that is interrupted while fetching it visits it again when it resumes.
+            state.visit(url)
+            if page is None:
                 continue
-            soup = BeautifulSoup(response.text, "html.parser")
-            for tag in soup.find_all(list(exclude)):
-                tag.extract()
-            yield soup.get_text()
-            new_fringe.extend(filtered(soup))
-        if len(new_fringe) > fringe_size:
-            new_fringe = list(rng.choice(new_fringe, fringe_size))
-        fringe = new_fringe
+            text, hrefs = page
+            state.new_fringe.extend(filtered(hrefs))
+            yield text
+        state.advance(rng, fringe_size)
+
+
+class _RateLimiter:
+    """Spaces out the requests made to each host by at least `min_interval` seconds."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        """Blocks until a request to the host of `url` may be made."""
+        if self.min_interval <= 0:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            t = max(now, self._next.get(host, now))
+            self._next[host] = t + self.min_interval
+        time.sleep(t - now)
+
+
+def _page(
+    url: str,
+    get: Callable[..., requests.Response],
+    rate_limiter: _RateLimiter,
+    timeout: float,
+    exclude,
+) -> Optional[Tuple[str, List[str]]]:
+    """Returns the text of the page at `url` and the targets of its hyperlinks, or None
+    if it cannot be fetched.
+    """
+    rate_limiter.wait(url)
+    try:
+        response = get(url, timeout=timeout)
+    except requests.exceptions.RequestException:
+        return None
+    soup = BeautifulSoup(response.text, "html.parser")
+    for tag in soup.find_all(list(exclude)):
+        tag.extract()
+    hrefs = [
+        href
+        for href in (a.get("href") for a in soup.find_all("a"))
+        if isinstance(href, str)
+    ]
+    return soup.get_text(), hrefs
+
+
+def concurrent_web_walk(
+    start: str,
+    rng: Generator,
+    websites: Optional[Set[str]] = None,
+    fringe_size: int = 10,
+    url_resolver: UrlResolver = lambda s: s,
+    exclude=NON_TEXTUAL_HTML_TAGS,
+    verbose: bool = False,
+    max_in_flight: int = 8,
+    timeout: float = 30,
+    min_interval: float = 0,
+    state: Optional[WalkState] = None,
+) -> Iterator[str]:
+    """Iterates over the web pages that are reachable from `start`, like `web_walk`,
+    but fetches and parses up to `max_in_flight` pages at a time in worker threads.
+    Pages are yielded, and hyperlinks collected, in the same order as in `web_walk`,
+    so the same seed visits the same pages.
+    :param max_in_flight: The maximum number of pages fetched at a time
+    :param timeout: The maximum number of seconds to wait for a server
+    :param min_interval: The minimum number of seconds between the starts of two
+        requests to the same host
+    See `web_walk` for the other parameters.
+    """
+    state = WalkState(start) if state is None else state
+    visited = state.visited
+    sessions = threading.local()
+    rate_limiter = _RateLimiter(min_interval)
+
+    def get(url: str, **kwargs) -> requests.Response:
+        # Sessions pool connections, but they are not safe to share across threads.
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        return sessions.session.get(url, **kwargs)
+
+    def filtered(hrefs: List[str]) -> Iterable[str]:
+        return {
+            resolved
+            for resolved in [url_resolver(href) for href in hrefs]
+            if resolved not in visited
+            and (
+                websites is None
+                or any(resolved.startswith(website + "/") for website in websites)
+            )
+        }
+
+    with ThreadPoolExecutor(max_in_flight) as executor:
+
+        def submit(url: str) -> "Future[Optional[Tuple[str, List[str]]]]":
+            return executor.submit(
+                _page, url_resolver(url), get, rate_limiter, timeout, exclude
+            )
+
+        while state.fringe:
+            urls = iter(state.fringe[state.position :])
+            pending: Deque = deque(
+                (url, submit(url)) for url in islice(urls, max_in_flight)
+            )
+            while pending:
+                url, future = pending.popleft()
+                for next_url in islice(urls, 1):
+                    pending.append((next_url, submit(next_url)))
+                if verbose:
+                    print("Visiting {}...".format(url))
+                page = future.result()
+                # As in `web_walk`, the state is updated only once the page has been
+                # fetched.
+                state.visit(url)
+                if page is None:
+                    continue
+                text, hrefs = page
+                state.new_fringe.extend(filtered(hrefs))
+                yield text
+            state.advance(rng, fringe_size)
 
 
 def get_prefixer(prefix: str, resolver: UrlResolver = lambda x: x) -> UrlResolver:
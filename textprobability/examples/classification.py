@@ -22,6 +22,7 @@ print("Loading language data from JSON...")
 t0 = time.time()
 from textprobability.classify import default_classifier
 
+default_classifier.preload()
 print(f"Loaded default classifier in {time.time() - t0:.1f} seconds.")
 
 
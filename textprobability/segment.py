@@ -0,0 +1,158 @@
+"""Scores long documents token by token, and divides documents that mix languages into
+spans of one language each.
+
+Documents are given as iterables of chunks of text (for example, the lines of a file),
+which are read one at a time: tokens that straddle chunks are reassembled, and the
+Markov context of each token is carried across chunks. The log-score of each token is
+the log of its conditional probability given the tokens before it, as computed by the
+default log_markov P (see defaults.py), so that the log-scores of the tokens of a
+string add up to the log_markov of the string. Undefined log-scores are -inf.
+"""
+
+from array import array
+from collections import deque
+from math import log
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple
+
+from textprobability.core.compiled import compile_scp
+from textprobability.core.defaults import DEFAULT_DATA_PATH, log_markov
+from textprobability.core.splitters import iter_latin_token_spans, latin_tokens
+from textprobability.core.types import Unit
+
+
+class Score(NamedTuple):
+    """The log-scores under each language of the text between two offsets."""
+
+    start: int
+    end: int
+    log_scores: Dict[str, float]
+
+
+class Segment(NamedTuple):
+    """A span of text in one language."""
+
+    langcode: str
+    start: int
+    end: int
+
+
+def token_log_scores(
+    chunks: Iterable[str], langcodes: Iterable[str], path=DEFAULT_DATA_PATH
+) -> Iterator[Score]:
+    """Iterates over the tokens of the concatenation of `chunks`, yielding the
+    log-score of each under each of the given languages.
+    """
+    scps = {langcode: compile_scp(log_markov(langcode, path)) for langcode in langcodes}
+    for scp in scps.values():
+        if scp.splitter is not latin_tokens:
+            raise ValueError("Only Ps that split strings into latin tokens can stream.")
+    context = max(scp.context for scp in scps.values())
+    # The tokens on which the probability of the next token may depend, and that token.
+    window: Deque[Unit] = deque(maxlen=context + 1)
+    for token, start, end in iter_latin_token_spans(chunks):
+        window.append(token)
+        sequence = tuple(window)
+        i = len(sequence) - 1
+        scores = {}
+        for langcode, scp in scps.items():
+            score = scp.evaluate(sequence, i)
+            scores[langcode] = float("-inf") if score is None else score
+        yield Score(start, end, scores)
+
+
+def log_scores(
+    chunks: Iterable[str],
+    langcodes: Iterable[str],
+    window: int = 1,
+    path=DEFAULT_DATA_PATH,
+) -> Iterator[Score]:
+    """Iterates over consecutive windows of `window` tokens of the concatenation of
+    `chunks` (the last of which may be shorter), yielding the log-score of each under
+    each of the given languages. See `token_log_scores`.
+    """
+    current = None
+    n_tokens = 0
+    for score in token_log_scores(chunks, langcodes, path):
+        if current is None:
+            current = score
+        else:
+            current = Score(
+                current.start,
+                score.end,
+                {
+                    langcode: current.log_scores[langcode] + log_score
+                    for langcode, log_score in score.log_scores.items()
+                },
+            )
+        n_tokens += 1
+        if n_tokens == window:
+            yield current
+            current = None
+            n_tokens = 0
+    if current is not None:
+        yield current
+
+
+def segment(
+    chunks: Iterable[str],
+    priors: Dict[str, float],
+    switch_probability: float = 1e-3,
+    path=DEFAULT_DATA_PATH,
+) -> List[Segment]:
+    """Divides the concatenation of `chunks` into spans of one language each, by finding
+    the most probable assignment of languages to its tokens (the Viterbi path) in one
+    pass. One small integer per token per language is held until the end.
+    :param priors: A map from BCP-47 language codes to numbers that are proportional to
+        the prior probabilities that a document begins in each language
+    :param switch_probability: The probability that the language changes after any
+        given token
+    :return: The spans, each of which runs from the start of its first token to the end
+        of its last token
+    """
+    if not 0 < switch_probability < 1:
+        raise ValueError("The switch probability must be between 0 and 1.")
+    langcodes = list(priors)
+    total = sum(priors.values())
+    if total <= 0:
+        raise ValueError("At least one prior must be positive.")
+    log_stay = log(1 - switch_probability)
+    log_switch = log(switch_probability / max(len(langcodes) - 1, 1))
+    # The log-probability of the most probable path that ends in each language
+    best = [
+        log(priors[langcode] / total) if priors[langcode] > 0 else float("-inf")
+        for langcode in langcodes
+    ]
+    # For each token, the language of the previous token on the most probable path that
+    # ends in each language
+    backpointers = array("B")
+    starts, ends = array("q"), array("q")
+    for score in token_log_scores(chunks, langcodes, path):
+        emissions = [score.log_scores[langcode] for langcode in langcodes]
+        if max(emissions) == float("-inf"):  # The token says nothing about language.
+            emissions = [0.0] * len(langcodes)
+        next_best = []
+        for j, emission in enumerate(emissions):
+            candidates = [
+                log_p + (log_stay if i == j else log_switch)
+                for i, log_p in enumerate(best)
+            ]
+            i = max(range(len(langcodes)), key=candidates.__getitem__)
+            backpointers.append(i)
+            next_best.append(candidates[i] + emission)
+        best = next_best
+        starts.append(score.start)
+        ends.append(score.end)
+    if not starts:
+        return []
+    j = max(range(len(langcodes)), key=best.__getitem__)
+    labels = array("B", [0] * len(starts))
+    for t in reversed(range(len(starts))):
+        labels[t] = j
+        j = backpointers[t * len(langcodes) + j]
+    segments: List[Segment] = []
+    for t, j in enumerate(labels):
+        if segments and segments[-1].langcode == langcodes[j]:
+            segments[-1] = segments[-1]._replace(end=ends[t])
+        else:
+            segments.append(Segment(langcodes[j], starts[t], ends[t]))
+    return segments
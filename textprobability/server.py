@@ -0,0 +1,268 @@
+"""A long-running server that loads the default models once and serves classification
+and scoring to other processes over a Unix socket or a local TCP port. See client.py
+for the protocol and for a client.
+
+Requests that arrive at about the same time are grouped into micro-batches, each of
+which is scored in one call of a batched P (see core/batch.py and core/joint.py).
+"""
+
+import argparse
+from concurrent.futures import Future
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from textprobability.client import DEFAULT_SOCKET, Address
+from textprobability.core import batch
+from textprobability.core.defaults import DEFAULT_DATA_PATH
+from textprobability.core.joint import joint_markov
+
+DEFAULT_PRIORS = {"en": 10.58, "es": 5.47, "fr": 4.07, "pt": 3.54, "de": 1.74}
+
+
+class _Batcher:
+    """Scores the strings of concurrent requests together. A batch is scored as soon as
+    it holds `max_batch` strings, or `max_delay` seconds after its first request
+    arrived.
+    """
+
+    def __init__(
+        self,
+        score_many: Callable[[Sequence[str]], np.ndarray],
+        max_batch: int,
+        max_delay: float,
+    ):
+        self._score_many = score_many
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._requests: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def submit(self, strings: List[str]) -> np.ndarray:
+        """Returns the scores of `strings`, one row per string."""
+        future: Future = Future()
+        self._requests.put((strings, future))
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._requests.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self._max_delay
+            while size < self._max_batch:
+                try:
+                    pending.append(
+                        self._requests.get(timeout=max(0, deadline - time.monotonic()))
+                    )
+                except queue.Empty:
+                    break
+                size += len(pending[-1][0])
+            try:
+                scores = self._score_many(
+                    [s for strings, _ in pending for s in strings]
+                )
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for strings, future in pending:
+                future.set_result(scores[start : start + len(strings)])
+                start += len(strings)
+
+
+def _probability(p: float) -> Optional[float]:
+    return None if np.isnan(p) else float(p)
+
+
+class Models:
+    """The models served by a server, with a batcher for each."""
+
+    def __init__(
+        self,
+        priors: Dict[str, float],
+        path=DEFAULT_DATA_PATH,
+        max_batch: int = 256,
+        max_delay: float = 0.002,
+    ):
+        self.priors = priors
+        joint = joint_markov(list(priors), path)
+        self._langcodes = joint.langcodes
+        self._classify = _Batcher(joint.score_many, max_batch, max_delay)
+        self._scorers: Dict[Any, _Batcher] = {
+            (op, langcode): _Batcher(factory(langcode, path), max_batch, max_delay)
+            for op, factory in (
+                ("markov", batch.markov),
+                ("stateless", batch.stateless),
+            )
+            for langcode in priors
+        }
+
+    def handle(self, request: Dict[str, Any]) -> List[Any]:
+        """Returns the results of `request`. See client.py."""
+        op, strings = request.get("op"), request.get("strings")
+        if not isinstance(strings, list) or not all(
+            isinstance(s, str) for s in strings
+        ):
+            raise ValueError("The strings of a request must be a list of strings.")
+        if op == "classify":
+            priors = request.get("priors", self.priors)
+            for langcode in priors:
+                if langcode not in self._langcodes:
+                    raise ValueError("{} is not served.".format(langcode))
+            columns = [self._langcodes.index(langcode) for langcode in priors]
+            weights = np.array([priors[langcode] for langcode in priors])
+            scores = self._classify.submit(strings)[:, columns]
+            scores = weights * np.where(np.isnan(scores), 0, scores)
+            totals = scores.sum(axis=1)
+            return [
+                {
+                    langcode: float(p)
+                    for langcode, p in zip(
+                        priors,
+                        row / total if total > 0 else np.full(len(row), 1 / len(row)),
+                    )
+                }
+                for row, total in zip(scores, totals)
+            ]
+        scorer = self._scorers.get((op, request.get("langcode")))
+        if scorer is None:
+            raise ValueError(
+                "Unknown op {!r} or language {!r}.".format(op, request.get("langcode"))
+            )
+        return [_probability(p) for p in scorer.submit(strings)]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        models: Models = self.server.models  # type: ignore
+        for line in self.rfile:
+            try:
+                response: Dict[str, Any] = {"results": models.handle(json.loads(line))}
+            except Exception as e:
+                response = {"error": "{}: {}".format(type(e).__name__, e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _in_use(path: str) -> bool:
+    """Returns whether a server is listening on the Unix socket at `path`."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(models: Models, address: Address = DEFAULT_SOCKET) -> None:
+    """Serves `models` at `address` until interrupted."""
+    server: socketserver.BaseServer
+    if isinstance(address, str):
+        if os.path.exists(address):
+            if _in_use(address):
+                raise OSError("A server is already listening on {}.".format(address))
+            os.unlink(address)  # It was left behind by a server that crashed.
+        server = _UnixServer(address, _Handler)
+    else:
+        server = _TCPServer(address, _Handler)
+    server.models = models  # type: ignore
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if isinstance(address, str):
+            os.unlink(address)
+
+
+def main(
+    priors: Dict[str, float],
+    path: str,
+    address: Address,
+    max_batch: int,
+    max_delay: float,
+) -> int:
+    print("Loading the models of {}...".format(", ".join(priors)))
+    models = Models(priors, path, max_batch, max_delay)
+    print("Serving at {}.".format(address))
+    # Exit cleanly (removing the socket file) when terminated.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        serve(models, address)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="This script serves classification and scoring to other processes."
+    )
+    parser.add_argument(
+        "--priors",
+        default=",".join("{}={}".format(*item) for item in DEFAULT_PRIORS.items()),
+        help="The languages to serve and their default priors, as comma-separated "
+        "pairs such as en=10.58.",
+    )
+    parser.add_argument(
+        "--path",
+        default=DEFAULT_DATA_PATH,
+        help="The directory that holds the language data.",
+    )
+    parser.add_argument(
+        "--socket", default=DEFAULT_SOCKET, help="The path of the Unix socket."
+    )
+    parser.add_argument(
+        "--port",
+        default=None,
+        help="A TCP port on localhost to listen on instead of the Unix socket.",
+        type=int,
+    )
+    parser.add_argument(
+        "--max-batch",
+        default=256,
+        help="The greatest number of strings to score together.",
+        type=int,
+    )
+    parser.add_argument(
+        "--max-delay",
+        default=0.002,
+        help="The greatest number of seconds for which to delay a request so that it "
+        "can be scored together with others.",
+        type=float,
+    )
+    args = parser.parse_args()
+    sys.exit(
+        main(
+            {
+                langcode: float(prior)
+                for langcode, prior in (
+                    pair.split("=") for pair in args.priors.split(",")
+                )
+            },
+            args.path,
+            args.socket if args.port is None else ("127.0.0.1", args.port),
+            args.max_batch,
+            args.max_delay,
+        )
+    )